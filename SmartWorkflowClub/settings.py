@@ -44,6 +44,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # First, so its timings cover the rest of the stack.
+    'events.middleware.PerformanceMiddleware',
+    'events.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,11 +55,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Report per-request total/db/template timings in a Server-Timing header.
+# The histograms behind /stats/performance/ are recorded either way.
+PERFORMANCE_SERVER_TIMING = True
+
 ROOT_URLCONF = 'SmartWorkflowClub.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for PerformanceMiddleware.
+        'BACKEND': 'events.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,13 +83,96 @@ WSGI_APPLICATION = 'SmartWorkflowClub.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# events.backends.sqlite3 is Django's SQLite backend with WAL, relaxed fsyncs,
+# a bigger cache, write-locking transactions and retries on lock contention;
+# see its module docstring for the OPTIONS. Connections are kept for
+# CONN_MAX_AGE seconds instead of being reopened on every request.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'events.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
+# Read replicas. Anonymous GETs read from these aliases (events/routers.py);
+# everything else uses 'default'. For a local setup, add copies of the
+# database and keep them current with `manage.py sync_replicas --interval 5`:
+#
+# DATABASES['replica1'] = {
+#     **DATABASES['default'],
+#     'NAME': BASE_DIR / 'db-replica1.sqlite3',
+#     'TEST': {'MIRROR': 'default'},
+# }
+# REPLICA_DATABASES = ['replica1']
+#
+# Fragments are re-rendered after every sync, which only reaches the web
+# processes through a shared cache (see CACHES below).
+
+DATABASE_ROUTERS = ['events.routers.ReplicaRouter']
+REPLICA_DATABASES = []
+# How long after a POST a client keeps reading from the primary; longer
+# than the replication lag.
+REPLICA_STICKY_SECONDS = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The homepage fragments are invalidated through signals (events/cache.py), so
+# any backend works. Use the file based one when running several workers so
+# that they share the fragments and their version tokens:
+# 'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+# 'LOCATION': BASE_DIR / 'cache',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smartworkflowclub',
+    }
+}
+
+
+# Write-behind for contact messages and feedback (events/writebehind.py):
+# submissions are spooled to disk and inserted in batches by a background
+# thread. Off, they are saved on the request as usual.
+WRITE_BEHIND = False
+WRITE_BEHIND_SPOOL_DIR = BASE_DIR / 'spool'
+WRITE_BEHIND_BATCH_SIZE = 200
+WRITE_BEHIND_INTERVAL = 1.0
+# fsync every submission: survives power loss, not just a crashed process.
+WRITE_BEHIND_FSYNC = False
+# Flushes a row may fail before it is logged and dropped. Rows that break a
+# constraint (feedback on a deleted event) are dropped on their first failure.
+WRITE_BEHIND_MAX_ATTEMPTS = 5
+
+# Contact message retention, applied by `manage.py purge_contact_messages`
+# (run it daily). None keeps messages in the inbox, or at all, forever.
+CONTACT_MESSAGE_ARCHIVE_DAYS = 90
+CONTACT_MESSAGE_RETENTION_DAYS = 365
+
+# Throttling of public form posts (events/throttling.py): per client address
+# and per endpoint limits, as '<count>/<window>' with s, m, h or d windows.
+# None lifts a limit. The counters live in each process; with several
+# workers, share them through a cache with an atomic incr() (Redis,
+# Memcached) named by THROTTLE_CACHE:
+# THROTTLE_BACKEND = 'events.throttling.CacheCounters'
+THROTTLE_BACKEND = 'events.throttling.LocalCounters'
+THROTTLE_CACHE = 'default'
+THROTTLE_RATES = {
+    'contact': {'ip': '5/10m', 'endpoint': '120/m'},
+    'feedback': {'ip': '10/10m', 'endpoint': '300/m'},
+    'club_register': {'ip': '3/h', 'endpoint': '30/h'},
+    'booking': {'ip': '10/10m', 'endpoint': '300/m'},
+}
+# Reverse proxies in front of the site that append to X-Forwarded-For; 0
+# uses the connection's address.
+THROTTLE_PROXY_COUNT = 0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -27,6 +27,10 @@ urlpatterns = [
     # Public pages
     path('', views.index, name='index'),
     path('home/', views.index, name='home'),
+    path('events/archive/', views.event_archive, name='event_archive'),
+    path('events/search/', views.event_search, name='event_search'),
+    path('feeds/events.ics', views.events_ics, name='events_ics'),
+    path('feeds/events.json', views.events_json, name='events_json'),
 
     # Authentication
     path('login/', views.custom_login, name='login'),
@@ -44,6 +48,7 @@ urlpatterns = [
     # Admin actions
     path('approve_event/<int:event_id>/', views.approve_event, name='approve_event'),
     path('reject_event/<int:event_id>/', views.reject_event, name='reject_event'),
+    path('event/manage/bulk/', views.bulk_moderate_events, name='bulk_moderate_events'),
     path('approve_club/<int:club_id>/', views.approve_club, name='approve_club'),
     path('suspend_club/<int:club_id>/', views.suspend_club, name='suspend_club'),
 
@@ -58,8 +63,19 @@ urlpatterns = [
 
 
     path('events/feedbacks/<int:id>/', views.feedbacks_view, name='feedbacks'),
+    path('events/feedbacks/<int:id>/page/', views.feedback_page, name='feedback_page'),
+    path('events/<int:id>/book/', views.book_event, name='book_event'),
+    path('bookings/<uuid:token>/cancel/', views.cancel_booking_view, name='cancel_booking'),
     path('events/club_view_feedbacks/', views.club_view_feedbacks, name='club_view_feedbacks'),
     path('contact-messages/', views.view_contact_messages, name='view_contact_messages'),
+    path('contact-messages/update/', views.update_contact_messages, name='update_contact_messages'),
+    path('exports/feedback.csv', views.export_feedback, {'format': 'csv'}, name='export_feedback_csv'),
+    path('exports/feedback.xlsx', views.export_feedback, {'format': 'xlsx'}, name='export_feedback_xlsx'),
+    path('exports/contact-messages.csv', views.export_contact_messages, {'format': 'csv'},
+         name='export_contact_messages_csv'),
+    path('exports/contact-messages.xlsx', views.export_contact_messages, {'format': 'xlsx'},
+         name='export_contact_messages_xlsx'),
+    path('stats/performance/', views.performance_stats, name='performance_stats'),
 
 ]
 if settings.DEBUG:
@@ -8,3 +8,4 @@ admin.site.register(User)
 admin.site.register(Club)
 admin.site.register(Event)
 admin.site.register(Feedback)
+admin.site.register(Booking)
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        from . import feeds, instrumentation, search, signals  # noqa: F401
+
+        # Migrations run without the SQL triggers, which SQLite would drop or
+        # choke on while rebuilding the tables they refer to.
+        pre_migrate.connect(search.drop_search_triggers, sender=self)
+        post_migrate.connect(search.install_search_triggers, sender=self)
+        pre_migrate.connect(feeds.drop_feed_triggers, sender=self)
+        post_migrate.connect(feeds.install_feed_triggers, sender=self)
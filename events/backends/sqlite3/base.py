@@ -0,0 +1,78 @@
+"""SQLite backend tuned for a small production site.
+
+Use it as the ENGINE ``events.backends.sqlite3``. Besides the options of
+Django's own SQLite backend it accepts these OPTIONS (defaults in brackets):
+
+- ``journal_mode`` ('WAL'): readers no longer block the writer, nor it them.
+- ``synchronous`` ('NORMAL'): with WAL, only a power loss can lose the
+  last commits, and never corrupts the file.
+- ``cache_size`` (-65536, i.e. 64 MiB) and ``mmap_size`` (256 MiB).
+- ``transaction_mode`` ('IMMEDIATE'): take the write lock when an atomic
+  block starts. A deferred transaction that reads first and then writes
+  fails at once with "database is locked" when another writer got in
+  between, however long ``timeout`` is.
+- ``lock_retries`` (3): how often a statement outside a transaction is
+  retried after ``timeout`` seconds of lock contention ran out.
+
+``timeout`` (Django's default is 5 seconds) is SQLite's busy timeout.
+"""
+import time
+
+from django.db.backends.sqlite3 import base as sqlite3
+
+TUNING_DEFAULTS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 256 * 1024 * 1024,
+    'transaction_mode': 'IMMEDIATE',
+    'lock_retries': 3,
+}
+PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size')
+
+
+def is_locked_error(exc):
+    return isinstance(exc, sqlite3.Database.OperationalError) and 'database is locked' in str(exc)
+
+
+class RetryingCursorWrapper(sqlite3.SQLiteCursorWrapper):
+    """Retry a statement that ran into a locked database, unless in a transaction.
+
+    Inside a transaction the whole transaction would have to be retried,
+    which only the caller can do.
+    """
+
+    lock_retries = 0
+
+    def execute(self, query, params=None):
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return super().execute(query, params)
+            except sqlite3.Database.OperationalError as exc:
+                if attempt == self.lock_retries or self.connection.in_transaction or not is_locked_error(exc):
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+
+
+class DatabaseWrapper(sqlite3.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.tuning = {key: params.pop(key, default) for key, default in TUNING_DEFAULTS.items()}
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma in PRAGMAS:
+            if pragma == 'journal_mode' and self.is_in_memory_db():
+                continue
+            conn.execute(f'PRAGMA {pragma} = {self.tuning[pragma]}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        cursor.lock_retries = self.tuning['lock_retries']
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.tuning['transaction_mode']}")
@@ -0,0 +1,7 @@
+"""Benchmark helpers shared by the ``bench_*`` management commands.
+
+The commands never touch the configured database: they build a throwaway
+test database, seed it with :mod:`events.bench.seed` and time requests
+through the Django test client, or through a local server driven by
+:mod:`events.bench.load`.
+"""
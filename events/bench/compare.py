@@ -0,0 +1,37 @@
+"""Diff a benchmark result file against a stored baseline."""
+
+# (metric, True when a larger value is worse)
+LATENCY_METRICS = (('p50_ms', True), ('p95_ms', True), ('p99_ms', True), ('rps', False))
+
+
+def relative_change(old, new):
+    return (new - old) / old if old else 0.0
+
+
+def regressions(results, baseline, threshold):
+    """Everything that got worse than the baseline by more than ``threshold``.
+
+    Latency and throughput may move by up to ``threshold`` (0.2 = 20%) before
+    they count; any extra query per request counts. Routes missing from
+    either side are ignored. Returns a list of human-readable lines.
+    """
+    found = []
+    for mode in ('client', 'server'):
+        for route, old in baseline.get(mode, {}).items():
+            new = results.get(mode, {}).get(route)
+            if new is None:
+                continue
+            for metric, larger_is_worse in LATENCY_METRICS:
+                change = relative_change(old[metric], new[metric])
+                if (change if larger_is_worse else -change) > threshold:
+                    found.append(f'{mode} {route}: {metric} {old[metric]:.2f} -> {new[metric]:.2f} '
+                                 f'({change:+.0%})')
+            if new.get('queries', 0) > old.get('queries', 0):
+                found.append(f"{mode} {route}: queries {old['queries']} -> {new['queries']}")
+            if new.get('errors', 0) > old.get('errors', 0):
+                found.append(f"{mode} {route}: errors {old['errors']} -> {new['errors']}")
+
+    old_rss, new_rss = baseline.get('peak_rss_kb'), results.get('peak_rss_kb')
+    if old_rss and new_rss and relative_change(old_rss, new_rss) > threshold:
+        found.append(f'peak RSS {old_rss} -> {new_rss} KiB ({relative_change(old_rss, new_rss):+.0%})')
+    return found
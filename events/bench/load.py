@@ -0,0 +1,79 @@
+"""Concurrent load against the project served by a local WSGI server."""
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.test.utils import override_settings
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ClosingWSGIHandler(WSGIHandler):
+    """Close the request thread's connections, as the dev server does not."""
+
+    def __call__(self, environ, start_response):
+        try:
+            return super().__call__(environ, start_response)
+        finally:
+            connections.close_all()
+
+
+@contextmanager
+def live_server(host='127.0.0.1'):
+    """Serve the project on a free port for the duration of the block; yields its base URL.
+
+    Needs a file-backed database: each server thread opens its own connection.
+    """
+    server = ThreadedWSGIServer((host, 0), QuietHandler, allow_reuse_address=False)
+    server.daemon_threads = True
+    server.set_app(ClosingWSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, host]):
+        thread.start()
+        try:
+            yield f'http://{host}:{server.server_port}'
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+def fetch(url, cookie=None):
+    request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return time.perf_counter() - started, status
+
+
+def session_cookie(client):
+    """The Cookie header that carries a logged-in test client's session."""
+    name = settings.SESSION_COOKIE_NAME
+    return f'{name}={client.cookies[name].value}' if name in client.cookies else None
+
+
+def run_load(url, requests, concurrency, cookie=None):
+    """GET ``url`` ``requests`` times from ``concurrency`` threads.
+
+    Returns the latency of every request, the wall time of the run and the
+    number of error responses.
+    """
+    with ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(lambda _: fetch(url, cookie), range(requests)))
+        elapsed = time.perf_counter() - started
+    return [timing for timing, _ in results], elapsed, sum(status >= 400 for _, status in results)
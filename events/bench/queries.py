@@ -0,0 +1,83 @@
+"""Capture the SQL a block of code runs, with where in the project it came from."""
+import re
+import sys
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+
+
+def normalize_sql(sql):
+    """Replace literals (and IN lists of them) so repeats of a query compare equal."""
+    return _IN_LISTS.sub('(...)', _LITERALS.sub('?', sql))
+
+
+_HARNESS = ('manage.py', '/management/commands/', '/bench/', '/tests.py')
+
+
+def project_stack(limit=8):
+    """The innermost frames of the call stack that belong to this project.
+
+    When the query comes from a template, the template tag that ran it is
+    appended as the last frame.
+    """
+    root = str(Path(settings.BASE_DIR).resolve())
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(root) and 'site-packages' not in frame.filename
+        and not any(part in frame.filename for part in _HARNESS)
+    ][-limit:]
+    node = template_node()
+    if node is not None:
+        frames.append(traceback.FrameSummary(
+            node.origin.name, node.token.lineno, 'template', lookup_line=False,
+            line=node.token.contents,
+        ))
+    return frames
+
+
+def template_node():
+    """The innermost template node being rendered, if any."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        node = frame.f_locals.get('self') if frame.f_code.co_name == 'render_annotated' else None
+        if getattr(node, 'token', None) is not None and getattr(node, 'origin', None) is not None:
+            return node
+        frame = frame.f_back
+    return None
+
+
+class QueryLog:
+    def __init__(self, with_stacks=True):
+        self.with_stacks = with_stacks
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, project_stack() if self.with_stacks else None))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def shapes(self):
+        return Counter(normalize_sql(sql) for sql, _ in self.queries)
+
+    def example(self, shape):
+        """The first (sql, stack) recorded for a normalized query."""
+        return next((sql, stack) for sql, stack in self.queries if normalize_sql(sql) == shape)
+
+
+@contextmanager
+def record_queries(with_stacks=True):
+    """Log every query run on any connection inside the block."""
+    log = QueryLog(with_stacks)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
@@ -0,0 +1,99 @@
+"""The routes served by events/views.py and how to request each one."""
+from django.test import Client
+from django.urls import URLPattern, get_resolver, reverse
+
+ADMIN, CLUB, ANONYMOUS = 'admin', 'club', 'anonymous'
+
+# Who requests each route; anything not listed is requested anonymously.
+ROUTE_USERS = {
+    'admin_dashboard': ADMIN,
+    'admin_club_manage': ADMIN,
+    'admin_event_manage': ADMIN,
+    'approve_event': ADMIN,
+    'reject_event': ADMIN,
+    'bulk_moderate_events': ADMIN,
+    'approve_club': ADMIN,
+    'suspend_club': ADMIN,
+    'view_contact_messages': ADMIN,
+    'update_contact_messages': ADMIN,
+    'performance_stats': ADMIN,
+    'export_feedback_csv': ADMIN,
+    'export_feedback_xlsx': ADMIN,
+    'export_contact_messages_csv': ADMIN,
+    'export_contact_messages_xlsx': ADMIN,
+    'club_dashboard': CLUB,
+    'add_event': CLUB,
+    'edit_event': CLUB,
+    'delete_event': CLUB,
+    'manage_event': CLUB,
+    'club_view_feedbacks': CLUB,
+}
+
+# Routes only reachable with a POST, and the data to send.
+ROUTE_POSTS = {
+    'bulk_moderate_events': lambda data: {'action': 'approve', 'event_ids': data['pending_ids']},
+    'update_contact_messages': lambda data: {'action': 'read', 'ids': data['message_ids']},
+}
+
+# Query strings for routes that do nothing useful without one.
+ROUTE_QUERIES = {
+    'event_search': 'q=work',
+}
+
+# Routes that change data even on a GET; never sent to a live server.
+MUTATING_ROUTES = {
+    'approve_event', 'reject_event', 'bulk_moderate_events', 'approve_club', 'suspend_club',
+    'delete_event', 'logout', 'update_contact_messages',
+}
+
+
+class Route:
+    def __init__(self, name, path, user, post_data=None):
+        self.name = name
+        self.path = path
+        self.user = user
+        self.post_data = post_data
+
+    @property
+    def mutating(self):
+        return self.name in MUTATING_ROUTES
+
+    def request(self, client):
+        if self.post_data is not None:
+            return client.post(self.path, self.post_data)
+        response = client.get(self.path)
+        if response.streaming:
+            # The body, and its queries, are only produced when read.
+            for _ in response.streaming_content:
+                pass
+        return response
+
+
+def routes(data):
+    """A Route for every view in events/views.py, addressed with the seeded ``data``.
+
+    ``data`` is what events.bench.seed.seed_dataset returns.
+    """
+    result = []
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLPattern) or pattern.callback.__module__ != 'events.views':
+            continue
+        if pattern.name == 'home':  # the same view as index
+            continue
+        kwargs = {key: data[key] for key in pattern.pattern.converters}
+        post = ROUTE_POSTS.get(pattern.name)
+        path = reverse(pattern.name, kwargs=kwargs)
+        if pattern.name in ROUTE_QUERIES:
+            path = f'{path}?{ROUTE_QUERIES[pattern.name]}'
+        result.append(Route(pattern.name, path,
+                            ROUTE_USERS.get(pattern.name, ANONYMOUS), post(data) if post else None))
+    return result
+
+
+def clients(data):
+    """A logged-in test client per kind of user."""
+    result = {ANONYMOUS: Client()}
+    for user in (ADMIN, CLUB):
+        result[user] = Client()
+        result[user].force_login(data[user])
+    return result
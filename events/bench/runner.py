@@ -0,0 +1,77 @@
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def benchmark_database(verbosity=0, sqlite_file=None):
+    """Run the block against a freshly migrated, throwaway test database.
+
+    SQLite test databases live in memory; pass ``sqlite_file`` to put it in a
+    file instead, as multi-threaded benchmarks need one connection per thread.
+    """
+    if sqlite_file and connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = str(sqlite_file)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+        teardown_test_environment()
+
+
+def time_requests(client, path, count, before_each=None):
+    """Request ``path`` ``count`` times and return the wall time of each request."""
+    timings = []
+    for _ in range(count):
+        if before_each:
+            before_each()
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f'GET {path} returned {response.status_code}')
+    return timings
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarize(timings, elapsed=None):
+    """Latency percentiles and throughput of a run.
+
+    Pass the run's wall time as ``elapsed`` when requests overlapped;
+    otherwise they are assumed to have run one after another.
+    """
+    ordered = sorted(timings)
+    return {
+        'requests': len(timings),
+        'rps': len(timings) / (elapsed or sum(timings)),
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+    }
+
+
+def format_summary(label, summary, width=12):
+    return (f"{label:<{width}} {summary['rps']:>9.1f} req/s   "
+            f"p50 {summary['p50_ms']:.2f} ms   p95 {summary['p95_ms']:.2f} ms   "
+            f"p99 {summary['p99_ms']:.2f} ms")
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
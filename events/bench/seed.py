@@ -0,0 +1,116 @@
+"""Deterministic data generator for the benchmarks."""
+import random
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+from ..models import Booking, Club, ContactMessage, Event, Feedback, User
+from ..ratings import rebuild_rating_aggregates
+
+SAMPLE_IMAGE = 'event_images/eventscom_cover.jpg'
+DESCRIPTION_WORDS = ['talk', 'workshop', 'music', 'sports', 'coding', 'art']
+VENUES = ['Campus Auditorium', 'Seminar Hall', 'Open Air Theatre', 'Main Ground', 'Library Hall']
+
+
+def seed_clubs(count, prefix='club'):
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', role='club',
+             is_staff=True, is_active=True)
+        for i in range(count)
+    ])
+    return Club.objects.bulk_create([
+        Club(user=user, name=user.username, contact_email=user.email)
+        for user in users
+    ])
+
+
+def seed_events(count, clubs, seed=0, approved_ratio=0.8, days_back=730, days_ahead=365, vocabulary=None):
+    """Create ``count`` events spread around today, the same ones for a given seed.
+
+    With a ``vocabulary``, titles and descriptions are drawn from it, for
+    benchmarks that need varied text.
+    """
+    words = vocabulary or DESCRIPTION_WORDS
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    events = []
+    for i in range(count):
+        start_hour = rng.randint(8, 18)
+        title = f'Event {i}'
+        if vocabulary:
+            title = ' '.join(rng.choice(vocabulary) for _ in range(3)).capitalize()
+        events.append(Event(
+            title=title,
+            description=' '.join(rng.choice(words) for _ in range(40)),
+            club=rng.choice(clubs),
+            venue=rng.choice(VENUES),
+            date=today + timedelta(days=rng.randint(-days_back, days_ahead)),
+            start_time=time(start_hour, rng.choice([0, 30])),
+            end_time=time(start_hour + rng.randint(1, 4), 0),
+            total_seats=rng.randint(20, 500),
+            guest=rng.choice(['', 'Guest Speaker']),
+            image=SAMPLE_IMAGE,
+            approved=rng.random() < approved_ratio,
+        ))
+    return Event.objects.bulk_create(events, batch_size=500)
+
+
+def seed_feedback(count, events, seed=0):
+    rng = random.Random(seed)
+    return Feedback.objects.bulk_create([
+        Feedback(event=rng.choice(events), rating=rng.randint(1, 5),
+                 comment=' '.join(rng.choice(['great', 'loved', 'the', 'talk', 'too', 'long', 'venue'])
+                                  for _ in range(12)))
+        for _ in range(count)
+    ], batch_size=500)
+
+
+def seed_contact_messages(count, seed=0):
+    rng = random.Random(seed)
+    return ContactMessage.objects.bulk_create([
+        ContactMessage(name=f'Visitor {i}', email=f'visitor{i}@example.com',
+                       message=' '.join(rng.choice(['when', 'is', 'the', 'next', 'event', 'hello'])
+                                        for _ in range(15)))
+        for i in range(count)
+    ], batch_size=500)
+
+
+def seed_bookings(count, event):
+    return Booking.objects.bulk_create([
+        Booking(event=event, name=f'Guest {i}', email=f'guest{i}@example.com', status=Booking.CONFIRMED)
+        for i in range(count)
+    ], batch_size=500)
+
+
+def seed_dataset(clubs=20, events=1000, feedback=2000, messages=500, bookings=100, club_events=None,
+                 seed=0, prefix='bench'):
+    """Seed a complete data set and return what the routes need to address it.
+
+    The first club owns ``club_events`` extra events (by default its share,
+    ``events // clubs``), one of them
+    approved and a week ahead; it carries the bookings and half the feedback.
+    Returns a dict with ``admin`` and ``club`` users plus URL kwargs.
+    """
+    all_clubs = seed_clubs(clubs, prefix=f'{prefix}club')
+    owner = all_clubs[0]
+    seed_events(events, all_clubs, seed=seed)
+    if club_events is None:
+        club_events = events // clubs
+    own_events = seed_events(max(club_events, 1), [owner], seed=seed + 1)
+    event = own_events[0]
+    Event.objects.filter(pk=event.pk).update(approved=True, date=timezone.localdate() + timedelta(days=7))
+    seed_feedback(feedback // 2, [event], seed=seed)
+    seed_feedback(feedback - feedback // 2, own_events, seed=seed + 1)
+    rebuild_rating_aggregates()
+    seed_contact_messages(messages, seed=seed)
+    booking = seed_bookings(max(bookings, 1), event)[0]
+    return {
+        'admin': User.objects.create_superuser(f'{prefix}admin', f'{prefix}admin@example.com', None),
+        'club': owner.user,
+        'event_id': event.pk,
+        'id': event.pk,
+        'club_id': owner.user_id,
+        'token': booking.cancel_token,
+        'pending_ids': list(Event.objects.filter(approved=False).values_list('pk', flat=True)),
+        'message_ids': list(ContactMessage.objects.values_list('pk', flat=True)[:20]),
+    }
@@ -0,0 +1,70 @@
+"""Seat reservations for events.
+
+Availability is the ``seats_booked`` counter on Event, changed only by
+conditional UPDATEs: the database checks and takes the seat in one statement,
+so concurrent requests can never oversell, on SQLite (single writer) or on
+PostgreSQL (row lock, WHERE re-evaluated after the lock). Deleting confirmed
+bookings, as the admin does, frees their seats like a cancellation
+(Booking.delete() and BookingQuerySet.delete()).
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import Booking, Event
+
+
+def reserve_seat(event, name, email):
+    """Book a seat, or join the waitlist once the event is full.
+
+    Returns the new Booking; its status tells which of the two happened.
+    """
+    with transaction.atomic():
+        seated = Event.objects.filter(
+            pk=event.pk, seats_booked__lt=F('total_seats')
+        ).update(seats_booked=F('seats_booked') + 1, updated_at=Now())
+        return Booking.objects.create(
+            event_id=event.pk,
+            name=name,
+            email=email,
+            status=Booking.CONFIRMED if seated else Booking.WAITLISTED,
+        )
+
+
+def cancel_booking(booking):
+    """Cancel a booking and hand its seat to the oldest waitlisted booking.
+
+    Returns the promoted Booking, or None if no one was promoted.
+    """
+    with transaction.atomic():
+        # Write first: on SQLite this takes the write lock for the rest of the
+        # transaction, so the waitlist read below cannot race another cancel.
+        freed_seat = Booking.objects.filter(
+            pk=booking.pk, status=Booking.CONFIRMED
+        ).update(status=Booking.CANCELLED)
+        if not freed_seat:
+            Booking.objects.filter(pk=booking.pk, status=Booking.WAITLISTED).update(status=Booking.CANCELLED)
+            return None
+        return release_seat(booking.event_id)
+
+
+def release_seat(event_id):
+    """Hand a freed seat of the event to its oldest waitlisted booking, or
+    give it back. Call inside the transaction that freed the seat.
+
+    Returns the promoted Booking, or None if no one was promoted.
+    """
+    with transaction.atomic():
+        promoted = (
+            Booking.objects.select_for_update(skip_locked=True)
+            .filter(event_id=event_id, status=Booking.WAITLISTED)
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if promoted is None:
+            Event.objects.filter(pk=event_id).update(seats_booked=F('seats_booked') - 1, updated_at=Now())
+            return None
+        # The seat moves to the promoted booking, so seats_booked is unchanged.
+        Booking.objects.filter(pk=promoted.pk).update(status=Booking.CONFIRMED)
+        promoted.status = Booking.CONFIRMED
+        return promoted
@@ -0,0 +1,62 @@
+"""Versioned fragment caching for the public pages.
+
+Each cached template fragment varies on a version token stored in the
+default cache. Saving or deleting a model bumps the tokens of the fragments
+that render it (see ``events/signals.py``), so stale fragments are simply
+never looked up again instead of expiring on a timer.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+FRAGMENT_VERSION_PREFIX = 'fragment-version:'
+
+_batch = threading.local()
+
+# Fragments rendered from each model, keyed by model name.
+HOMEPAGE_FRAGMENTS = {
+    'Event': ('home_upcoming', 'home_next_event', 'home_previous'),
+    'Club': ('home_clubs',),
+}
+
+
+def fragment_version(name):
+    """Return the current version token for a cached fragment."""
+    # A random-ish token rather than a counter: if the key is evicted we must
+    # not restart at a value that an old, still cached fragment was built with.
+    return cache.get_or_set(FRAGMENT_VERSION_PREFIX + name, time.time_ns, None)
+
+
+def fragment_versions(*names):
+    return {name: fragment_version(name) for name in names}
+
+
+def bump_fragment_versions(*names):
+    """Invalidate the given fragments by giving them a new version token."""
+    pending = getattr(_batch, 'names', None)
+    if pending is not None:
+        pending.update(names)
+        return
+    token = time.time_ns()
+    cache.set_many({FRAGMENT_VERSION_PREFIX + name: token for name in names}, None)
+
+
+@contextmanager
+def batched_invalidation():
+    """Collect the invalidations of the block and apply them once at its end.
+
+    For bulk operations whose signals would otherwise bump the same versions
+    once per row.
+    """
+    if getattr(_batch, 'names', None) is not None:
+        yield
+        return
+    _batch.names = set()
+    try:
+        yield
+    finally:
+        names, _batch.names = _batch.names, None
+        if names:
+            bump_fragment_versions(*names)
@@ -0,0 +1,143 @@
+"""Conditional GET (ETag and Last-Modified) from cheap data versions.
+
+Each page gets a validator function that returns the parts of its version and
+its last modification time without running the page's own queries: the
+fragment version tokens for the homepage, a single ``updated_at`` lookup for
+the others. A request whose If-None-Match (or If-Modified-Since) still
+matches gets a 304 before the view runs.
+"""
+import hashlib
+from datetime import datetime, time
+from functools import cache, wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import feeds
+from .cache import HOMEPAGE_FRAGMENTS, fragment_versions
+from .homepage import next_start
+from .models import Club, Event
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+@cache
+def templates_version():
+    """Newest template modification time, so a deploy that changes the
+    markup invalidates the ETags even when the data did not change."""
+    newest = 0
+    for config in apps.get_app_configs():
+        for path in Path(config.path, 'templates').rglob('*.html'):
+            newest = max(newest, path.stat().st_mtime)
+    return newest
+
+
+def _validators(request, validate, args, kwargs):
+    """The quoted ETag and Last-Modified timestamp of a request, or Nones."""
+    if request.method not in SAFE_METHODS or 'messages' in request.COOKIES:
+        # Pending flash messages are rendered once and must not be skipped.
+        return None, None
+    result = validate(request, *args, **kwargs)
+    if result is None:
+        return None, None
+    parts, last_modified = result
+    parts = (
+        request.get_full_path(), templates_version(), parts,
+        # The pages embed the CSRF token and differ per logged-in user.
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME), request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+    )
+    etag = quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+    return etag, int(max(last_modified.timestamp(), templates_version()))
+
+
+def _finish(request, response, etag, last_modified):
+    if etag is not None and request.method in SAFE_METHODS and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Revalidate on every navigation, and never from a shared cache.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(validate):
+    """Answer 304 Not Modified when ``validate`` says the page did not change.
+
+    ``validate(request, *args, **kwargs)`` returns ``(parts, last_modified)``,
+    where ``parts`` is anything whose repr() changes with the page's data, or
+    None to serve the page unconditionally. Works for sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                etag, last_modified = await sync_to_async(_validators)(request, validate, args, kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                etag, last_modified = _validators(request, validate, args, kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        return inner
+    return decorator
+
+
+def _start_of_today():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+def homepage_version(request, *args, **kwargs):
+    """The homepage fragment tokens, which every Event and Club change bumps.
+
+    The lists also move along with the date, hence the start of today, and
+    when the next upcoming event starts, hence next_start().
+    """
+    tokens = fragment_versions(*HOMEPAGE_FRAGMENTS['Event'], *HOMEPAGE_FRAGMENTS['Club'])
+    start, looked_up = next_start(timezone.localtime(), tokens['home_upcoming'])
+    changed = max(datetime.fromtimestamp(max(tokens.values()) / 1e9, tz=timezone.utc),
+                  datetime.fromtimestamp(looked_up, tz=timezone.utc))
+    return (sorted(tokens.items()), timezone.localdate(), start), max(changed, _start_of_today())
+
+
+def event_version(request, id, **kwargs):
+    """The event's updated_at, which new and deleted feedback bump too."""
+    updated_at = Event.objects.filter(pk=id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None  # let the view answer the 404
+    return (id, updated_at), updated_at
+
+
+def club_version(request, *args, **kwargs):
+    """The logged-in club and the newest change to any of its events."""
+    if not request.user.is_authenticated:
+        return None
+    latest = Club.objects.filter(user=request.user).aggregate(
+        club=Max('updated_at'), events=Max('event__updated_at'), count=Count('event'),
+    )
+    if latest['club'] is None:
+        return None
+    changed = max(filter(None, (latest['club'], latest['events'])))
+    return (request.user.pk, latest['count'], changed, timezone.localdate()), max(changed, _start_of_today())
+
+
+def feed_version(request, *args, **kwargs):
+    """The newest event change and deletion in the feed's scope."""
+    try:
+        club, venue = feeds.feed_filters(request)
+    except ValueError:
+        return None  # let the view answer the 400
+    changed, deleted = feeds.feed_version(club)
+    if changed is None and deleted is None:
+        return None
+    return (changed, deleted), max(filter(None, (changed, deleted)))
@@ -0,0 +1,209 @@
+"""Streaming CSV and XLSX exports of feedback and contact messages.
+
+Rows are read with ``iterator(chunk_size=EXPORT_CHUNK_SIZE)`` in primary key
+order, which SQLite reads straight off the table without a sort, so memory
+stays flat whatever the row count and the first bytes go out with the first
+chunk. XLSX files are zipped on the fly by zipfile, which supports writing
+to an unseekable stream; no spreadsheet library is needed.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import ContactMessage, Feedback
+
+EXPORT_CHUNK_SIZE = 2000
+# Rows per chunk of the response body.
+ROWS_PER_WRITE = 500
+# Excel refuses sheets longer than this; export more as CSV.
+XLSX_MAX_ROWS = 1_048_576
+XLSX_MAX_CELL_LENGTH = 32_767
+
+FEEDBACK_COLUMNS = (
+    ('id', 'id'),
+    ('submitted_at', 'submitted_at'),
+    ('rating', 'rating'),
+    ('comment', 'comment'),
+    ('event_id', 'event_id'),
+    ('event', 'event__title'),
+    ('event_date', 'event__date'),
+    ('club_id', 'event__club_id'),
+    ('club', 'event__club__name'),
+)
+CONTACT_MESSAGE_COLUMNS = (
+    ('id', 'id'),
+    ('submitted_at', 'submitted_at'),
+    ('name', 'name'),
+    ('email', 'email'),
+    ('message', 'message'),
+)
+
+
+def _submitted_between(queryset, date_from=None, date_to=None):
+    # A range on the column rather than __date, which would wrap it in a function.
+    if date_from:
+        queryset = queryset.filter(submitted_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    if date_to:
+        queryset = queryset.filter(
+            submitted_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+    return queryset
+
+
+def _rows(queryset, columns):
+    return queryset.order_by('pk').values_list(*(lookup for _, lookup in columns)).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def feedback_rows(date_from=None, date_to=None, club=None):
+    """(header, rows) of feedback with its event and club."""
+    feedback = _submitted_between(Feedback.objects.all(), date_from, date_to)
+    if club is not None:
+        feedback = feedback.filter(event__club_id=club)
+    return [name for name, _ in FEEDBACK_COLUMNS], _rows(feedback, FEEDBACK_COLUMNS)
+
+
+def contact_message_rows(date_from=None, date_to=None):
+    """(header, rows) of contact messages."""
+    messages = _submitted_between(ContactMessage.objects.all(), date_from, date_to)
+    return [name for name, _ in CONTACT_MESSAGE_COLUMNS], _rows(messages, CONTACT_MESSAGE_COLUMNS)
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == ROWS_PER_WRITE:
+            yield ''.join(batch) if isinstance(line, str) else b''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch) if isinstance(batch[0], str) else b''.join(batch)
+
+
+class _Echo:
+    """A file for csv.writer that hands back what is written."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_safe(value):
+    # Spreadsheets run cells starting with these as formulas; feedback and
+    # contact messages are written by the public.
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    """CSV lines, with a BOM so that Excel reads them as UTF-8."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(header)
+    yield from _batched(writer.writerow([_csv_safe(_cell(value)) for value in row]) for row in rows)
+
+
+class _Pipe(io.RawIOBase):
+    """An unseekable file that keeps what is written until drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_NS = 'http://schemas.openxmlformats.org/'
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        f'<Types xmlns="{_NS}package/2006/content-types">'
+        f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        f'<Default Extension="xml" ContentType="application/xml"/>'
+        f'<Override PartName="/xl/workbook.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        f'<Override PartName="/xl/worksheets/sheet1.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        f'</Types>'
+    ),
+    '_rels/.rels': (
+        f'<Relationships xmlns="{_NS}package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{_NS}officeDocument/2006/relationships/officeDocument" '
+        f'Target="xl/workbook.xml"/></Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        f'<Relationships xmlns="{_NS}package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{_NS}officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet1.xml"/></Relationships>'
+    ),
+}
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number, values):
+    cells = []
+    for index, value in enumerate(values):
+        ref = f'{_column_letter(index)}{number}'
+        value = _cell(value)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_INVALID_XML.sub('', str(value))[:XLSX_MAX_CELL_LENGTH])
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(header, rows, sheet_name):
+    """An XLSX workbook of one sheet, zipped as the rows are read.
+
+    Strings are inline, so there is no shared string table to hold in
+    memory. Rows past Excel's limit of XLSX_MAX_ROWS are left out.
+    """
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, xml in _XLSX_PARTS.items():
+            workbook.writestr(name, xml)
+        workbook.writestr('xl/workbook.xml', (
+            f'<workbook xmlns="{_NS}spreadsheetml/2006/main" '
+            f'xmlns:r="{_NS}officeDocument/2006/relationships"><sheets>'
+            f'<sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(f'<worksheet xmlns="{_NS}spreadsheetml/2006/main"><sheetData>'.encode())
+            sheet.write(_xlsx_row(1, header).encode())
+            numbered = zip(range(2, XLSX_MAX_ROWS + 1), rows)
+            for chunk in _batched(_xlsx_row(number, row).encode() for number, row in numbered):
+                sheet.write(chunk)
+                yield pipe.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield pipe.drain()
@@ -0,0 +1,252 @@
+"""iCalendar and JSON feeds of approved events, streamed, with incremental sync.
+
+Feeds cover every approved event, or those of one club (``?club=<id>``) or
+venue (``?venue=<name>``). They are generated row by row from
+``iterator()``, so a large feed never sits in memory.
+
+Change tracking is ``Event.updated_at``, which a change to the event's club
+bumps too, plus an EventTombstone per deleted event. On SQLite triggers
+record both, whatever SQL makes the change; on other databases the signal
+handlers in events/signals.py do, for changes made through the ORM.
+JSON clients sync incrementally: each response carries a
+``sync_token`` which, sent back as ``?sync_token=``, returns only the events
+changed since plus the ids of those removed (deleted, unpublished for
+re-approval or moved to another venue). ``If-Modified-Since`` works as an
+implicit token. Calendar clients expect a whole calendar on every fetch, so
+the .ics feed answers ``If-Modified-Since``/``If-None-Match`` with a 304
+when nothing changed and with the full feed otherwise.
+"""
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max
+from django.db.models.functions import Now
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Event, EventTombstone
+from .scheduling import at_venue
+
+FEED_CHUNK_SIZE = 500
+# Tombstones are kept this long; older sync tokens get the full feed again.
+TOMBSTONE_DAYS = 30
+# Sync tokens point this far before the fetch, so that rows committed while
+# it ran are sent next time rather than missed. Clients upsert by id.
+SYNC_OVERLAP = timedelta(seconds=5)
+SYNC_TOKEN_SALT = 'events.feeds.sync_token'
+FEED_FIELDS = (
+    'id', 'title', 'description', 'venue', 'date', 'start_time', 'end_time', 'guest', 'updated_at',
+    'club__id', 'club__name', 'club__contact_email',
+)
+
+_TABLE = EventTombstone._meta.db_table
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+FEED_TRIGGERS = {
+    f'{_TABLE}_record': (
+        f"CREATE TRIGGER {_TABLE}_record AFTER DELETE ON events_event BEGIN "
+        f"INSERT INTO {_TABLE} (event_id, club_id, deleted_at) VALUES (old.id, old.club_id, {_NOW}); "
+        f"DELETE FROM {_TABLE} WHERE deleted_at < strftime('%Y-%m-%d %H:%M:%f', 'now', '-{TOMBSTONE_DAYS} days'); "
+        f"END"
+    ),
+    # The feeds show the club's name and email with every event, so a change
+    # to either is a change to its events.
+    'events_club_touch_events': (
+        "CREATE TRIGGER events_club_touch_events AFTER UPDATE OF name, contact_email ON events_club "
+        "WHEN old.name IS NOT new.name OR old.contact_email IS NOT new.contact_email BEGIN "
+        f"UPDATE events_event SET updated_at = {_NOW} WHERE club_id = new.id; END"
+    ),
+}
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+def drop_feed_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Drop the triggers; connected to pre_migrate, like the search triggers."""
+    if not has_feed_triggers(using):
+        return
+    with connections[using].cursor() as cursor:
+        for name in FEED_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def install_feed_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Record a tombstone for every deleted event and touch the events of a
+    changed club, however either happens; connected to post_migrate."""
+    connection = connections[using]
+    if not has_feed_triggers(using):
+        return
+    with connection.cursor() as cursor:
+        if _TABLE not in connection.introspection.table_names(cursor):
+            return
+        for name, statement in FEED_TRIGGERS.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(statement)
+
+
+def has_feed_triggers(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'sqlite'
+
+
+def record_tombstone(event, using=DEFAULT_DB_ALIAS):
+    """What the tombstone trigger does, for databases without it."""
+    if has_feed_triggers(using):
+        return
+    tombstones = EventTombstone.objects.using(using)
+    tombstones.create(event_id=event.pk, club_id=event.club_id, deleted_at=timezone.now())
+    tombstones.filter(deleted_at__lt=timezone.now() - timedelta(days=TOMBSTONE_DAYS)).delete()
+
+
+def touch_club_events(club, using=DEFAULT_DB_ALIAS):
+    """What the club trigger does, for databases without it: the feeds show
+    the club's name and email with its events."""
+    if has_feed_triggers(using):
+        return
+    Event.objects.using(using).filter(club_id=club.pk).update(updated_at=Now())
+
+
+def feed_filters(request):
+    """The ``?club=`` and ``?venue=`` of a feed request; ValueError for a bad club."""
+    club = request.GET.get('club')
+    return (int(club) if club else None), (request.GET.get('venue') or None)
+
+
+def feed_events(club=None, venue=None):
+    events = at_venue(venue) if venue else Event.objects.all()
+    events = events.filter(approved=True)
+    if club is not None:
+        events = events.filter(club_id=club)
+    return events
+
+
+def feed_version(club=None):
+    """(newest event change, newest deletion) in the feed's scope.
+
+    Two index lookups. Venue feeds use the scope of all events, since an
+    event can move between venues.
+    """
+    events = Event.objects.all() if club is None else Event.objects.filter(club_id=club)
+    tombstones = EventTombstone.objects.all() if club is None else EventTombstone.objects.filter(club_id=club)
+    return (events.aggregate(changed=Max('updated_at'))['changed'],
+            tombstones.aggregate(deleted=Max('deleted_at'))['deleted'])
+
+
+def make_sync_token(moment):
+    return signing.dumps(moment.isoformat(), salt=SYNC_TOKEN_SALT)
+
+
+def read_sync_token(token):
+    try:
+        return datetime.fromisoformat(signing.loads(token, salt=SYNC_TOKEN_SALT))
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidSyncToken('Invalid sync token.')
+
+
+def feed_changes(since, club=None, venue=None):
+    """(events changed since ``since``, ids removed from the feed since).
+
+    Returns None when ``since`` is older than the tombstones, as deletions
+    before then are unknown and the client needs the full feed.
+    """
+    if since < timezone.now() - timedelta(days=TOMBSTONE_DAYS):
+        return None
+    events = feed_events(club, venue)
+    changed = events.filter(updated_at__gte=since)
+    scope = Event.objects.all() if club is None else Event.objects.filter(club_id=club)
+    # Changed, but not (or no longer) in the feed.
+    left = scope.filter(updated_at__gte=since).exclude(pk__in=events.values('pk')).values_list('pk', flat=True)
+    tombstones = EventTombstone.objects.filter(deleted_at__gte=since)
+    if club is not None:
+        tombstones = tombstones.filter(club_id=club)
+    return changed, left.union(tombstones.values_list('event_id', flat=True))
+
+
+def _ordered(events):
+    return events.select_related('club').only(*FEED_FIELDS).order_by('date', 'start_time', 'id')
+
+
+def _start_end(event):
+    start = timezone.make_aware(datetime.combine(event.date, event.start_time))
+    end = timezone.make_aware(datetime.combine(event.date, event.end_time))
+    return start, end
+
+
+def event_json(event, request):
+    start, end = _start_end(event)
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description,
+        'club': {'id': event.club.id, 'name': event.club.name},
+        'venue': event.venue,
+        'guest': event.guest,
+        'start': start,
+        'end': end,
+        'url': request.build_absolute_uri(reverse('feedbacks', kwargs={'id': event.id})),
+        'updated_at': event.updated_at,
+    }
+
+
+def stream_json(request, events, removed, sync_token, full):
+    """The JSON feed, one event at a time."""
+    yield '{"full": %s, "sync_token": %s, "events": [' % (json.dumps(full), json.dumps(sync_token))
+    separator = ''
+    for event in _ordered(events).iterator(chunk_size=FEED_CHUNK_SIZE):
+        yield separator + json.dumps(event_json(event, request), cls=DjangoJSONEncoder)
+        separator = ', '
+    yield '], "removed": %s}' % json.dumps(sorted(removed))
+
+
+def ics_text(value):
+    """Escape a TEXT value (RFC 5545, 3.3.11)."""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n'))
+
+
+def ics_line(line):
+    """Fold a content line to 75 octets, never splitting a UTF-8 character."""
+    encoded = line.encode()
+    parts, start, limit = [], 0, 75
+    while len(encoded) - start > limit:
+        end = start + limit
+        while encoded[end] & 0xC0 == 0x80:  # continuation byte
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74  # continuation lines start with a space
+    parts.append(encoded[start:].decode())
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def ics_datetime(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def stream_ics(request, events, name):
+    """The iCalendar feed, one VEVENT at a time."""
+    host = request.get_host().split(':')[0]
+    yield ''.join(ics_line(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//SmartWorkflowClub//Events//EN', 'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{ics_text(name)}',
+    ))
+    for event in _ordered(events).iterator(chunk_size=FEED_CHUNK_SIZE):
+        start, end = _start_end(event)
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:event-{event.id}@{host}',
+            f'DTSTAMP:{ics_datetime(event.updated_at)}',
+            f'LAST-MODIFIED:{ics_datetime(event.updated_at)}',
+            f'DTSTART:{ics_datetime(start)}',
+            f'DTEND:{ics_datetime(end)}',
+            f'SUMMARY:{ics_text(event.title)}',
+            f'DESCRIPTION:{ics_text(event.description)}',
+            f'LOCATION:{ics_text(event.venue)}',
+            f'ORGANIZER;CN="{event.club.name.replace(chr(34), "")}":mailto:{event.club.contact_email}',
+            f'URL:{request.build_absolute_uri(reverse("feedbacks", kwargs={"id": event.id}))}',
+            'END:VEVENT',
+        ]
+        yield ''.join(ics_line(line) for line in lines)
+    yield ics_line('END:VCALENDAR')
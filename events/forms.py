@@ -29,6 +29,7 @@ from .models import Event
 from django import forms
 from .models import Event
 from django.utils import timezone
+from .scheduling import conflict_message, conflicting_events, suggest_slots
 
 class EventForm(forms.ModelForm):
     class Meta:
@@ -41,6 +42,10 @@ class EventForm(forms.ModelForm):
         }
       
 
+    def clean_venue(self):
+        # Collapse stray whitespace so the same venue always matches itself.
+        return ' '.join(self.cleaned_data['venue'].split())
+
     def clean_date(self):
         date = self.cleaned_data.get('date')
         if date < timezone.now().date():
@@ -54,7 +59,15 @@ class EventForm(forms.ModelForm):
 
         if start and end and start >= end:
             raise forms.ValidationError("End time must be after start time.")
-        
+
+        venue = cleaned_data.get('venue')
+        date = cleaned_data.get('date')
+        if venue and date and start and end:
+            conflicts = conflicting_events(venue, date, start, end, exclude=self.instance.pk)
+            if conflicts:
+                slots = suggest_slots(venue, date, start, end, exclude=self.instance.pk)
+                raise forms.ValidationError(conflict_message(venue, date, conflicts, slots))
+
         return cleaned_data
 
 
@@ -84,3 +97,30 @@ class ContactForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Email ID', 'required': 'required'}),
             'message': forms.Textarea(attrs={'class': 'form-control', 'placeholder': 'Enter your message', 'rows': 4, 'required': 'required'}),
         }
+
+
+from django import forms
+from .models import Booking
+
+class BookingForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = ['name', 'email']
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Name', 'required': 'required'}),
+            'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Email ID', 'required': 'required'}),
+        }
+
+
+class ExportFilterForm(forms.Form):
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    club = forms.IntegerField(required=False, min_value=1)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("date_from must not be after date_to.")
+        return cleaned_data
@@ -0,0 +1,113 @@
+import math
+import time
+from datetime import datetime
+from itertools import zip_longest
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Event
+from .pagination import keyset_page
+
+# Columns the homepage carousels actually render.
+HOMEPAGE_EVENT_FIELDS = ('id', 'title', 'description', 'date', 'start_time', 'image', 'image_renditions')
+
+# The homepage embeds only the most recent past events; older ones are paged
+# in from the archive endpoint as the carousel advances.
+PREVIOUS_ORDERING = ('-date', '-start_time', '-id')
+HOMEPAGE_PREVIOUS_LIMIT = 12
+ARCHIVE_PAGE_SIZE = 9
+
+def batch_events(iterable, n=3):
+    """Group events into batches of size n"""
+    args = [iter(iterable)] * n
+    return list(zip_longest(*args, fillvalue=None))
+
+
+def batch_items(iterable, n=6):
+    args = [iter(iterable)] * n
+    return list(zip_longest(*args, fillvalue=None))
+
+
+def upcoming_events(now):
+    """Approved events on a later date, or today with a start_time still ahead."""
+    today = now.date()
+    return (
+        # Written as a range plus an exclusion (not an OR) so that SQLite
+        # can seek into event_approved_date_idx.
+        Event.objects.filter(approved=True, date__gte=today)
+        .exclude(date=today, start_time__lt=now.time())
+        .order_by('date', 'start_time')
+        .only(*HOMEPAGE_EVENT_FIELDS)
+    )
+
+
+NEXT_START_PREFIX = 'homepage-next-start:'
+
+
+def _next_start_entry(first, now):
+    """The cache entry for the first upcoming (date, start_time): (start
+    timestamp or 0 when there is none, when it was looked up) and its timeout."""
+    start = int(timezone.make_aware(datetime.combine(*first)).timestamp()) if first else 0
+    # Expire with the boundary, and a second after it so that the event is
+    # no longer upcoming when it is looked up again.
+    timeout = max(1, math.ceil(start - now.timestamp()) + 1) if start else None
+    return (start, int(time.time())), timeout
+
+
+def next_start(now, version):
+    """(When the first upcoming event starts, when that was looked up).
+
+    The upcoming lists change at that moment without any save bumping a
+    fragment version, so the homepage fragments and its ETag vary on it too.
+    It is cached per ``home_upcoming`` version until it passes, so a warm
+    homepage still runs no queries.
+    """
+    key = f'{NEXT_START_PREFIX}{version}'
+    entry = cache.get(key)
+    if entry is None or 0 < entry[0] <= now.timestamp():
+        first = upcoming_events(now).values_list('date', 'start_time').first()
+        entry, timeout = _next_start_entry(first, now)
+        cache.set(key, entry, timeout)
+    return entry
+
+
+def past_events(today):
+    return Event.objects.filter(approved=True, date__lt=today).only(*HOMEPAGE_EVENT_FIELDS)
+
+
+class HomepageSnapshot:
+    """The homepage event lists, each materialized by exactly one query.
+
+    Nothing is fetched until the template first touches an attribute, so
+    fragments served from the cache cost no queries at all.
+    """
+
+    def __init__(self, now):
+        self.now = now
+
+    @cached_property
+    def upcoming(self):
+        return list(upcoming_events(self.now))
+
+    @property
+    def slides(self):
+        return self.upcoming
+
+    @cached_property
+    def batches(self):
+        return batch_events(self.upcoming, 3)
+
+    @property
+    def next_event(self):
+        return self.upcoming[0] if self.upcoming else None
+
+    @cached_property
+    def previous_page(self):
+        return keyset_page(past_events(self.now.date()), PREVIOUS_ORDERING,
+                           page_size=HOMEPAGE_PREVIOUS_LIMIT)
+
+    @cached_property
+    def previous_batches(self):
+        return batch_events(self.previous_page, 3)
@@ -0,0 +1,107 @@
+"""Responsive renditions of uploaded event images.
+
+Every upload is resized into a few widths, each encoded as WebP and JPEG, in
+a background thread pool so the request that saved the event never waits for
+Pillow. The widths written are recorded on the events showing the image
+(``Event.image_renditions``), and the ``responsive_image`` template tag offers
+them in a srcset from there, without touching the storage.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models.functions import Now
+from PIL import Image
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+RENDITION_WIDTHS = (320, 640, 1024, 1600)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+RENDITION_DIR = 'renditions'
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='renditions')
+
+
+def rendition_name(name, width, ext):
+    """event_images/poster.png -> event_images/renditions/poster-png-640w.webp"""
+    directory, filename = posixpath.split(name)
+    stem = filename.replace('.', '-')
+    return posixpath.join(directory, RENDITION_DIR, f'{stem}-{width}w.{ext}')
+
+
+def image_storage():
+    return Event._meta.get_field('image').storage
+
+
+def available_renditions(image, ext):
+    """(url, width) pairs of the recorded renditions of an Event.image value."""
+    recorded = image.instance.image_renditions
+    if recorded.get('name') != image.name:
+        return []  # not generated yet, or generated for an earlier image
+    return [(image.storage.url(rendition_name(image.name, width, ext)), width) for width in recorded.get(ext, ())]
+
+
+def record_renditions(name, renditions):
+    """Store ``renditions`` on the events showing ``name``; returns how many changed."""
+    recorded = {'name': name, **renditions}
+    return Event.objects.filter(image=name).exclude(image_renditions=recorded).update(
+        image_renditions=recorded, updated_at=Now())
+
+
+def generate_renditions(name, overwrite=False):
+    """Write every missing rendition of the stored image ``name`` and record
+    them on its events.
+
+    The first width at or above the original's gets the original size
+    re-encoded, and larger widths are skipped. Returns (files written,
+    events updated).
+    """
+    storage = image_storage()
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+
+    written = 0
+    renditions = {ext: [] for ext in RENDITION_FORMATS}
+    for width in RENDITION_WIDTHS:
+        if width < original.width:
+            resized = original.resize((width, round(original.height * width / original.width)), Image.LANCZOS)
+        else:
+            resized = original
+        for ext, (image_format, save_options) in RENDITION_FORMATS.items():
+            path = rendition_name(name, width, ext)
+            renditions[ext].append(width)
+            if not overwrite and storage.exists(path):
+                continue
+            image = resized
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, image_format, **save_options)
+            if overwrite:
+                storage.delete(path)
+            storage.save_derived(path, ContentFile(buffer.getvalue()))
+            written += 1
+        if resized is original:
+            break
+    return written, record_renditions(name, renditions)
+
+
+def _generate_in_background(name, on_done):
+    try:
+        if any(generate_renditions(name)) and on_done:
+            on_done()
+    except Exception:
+        logger.exception('Could not generate renditions for %s', name)
+
+
+def schedule_renditions(name, on_done=None):
+    """Queue rendition generation; ``on_done`` runs if any files or events changed."""
+    return _executor.submit(_generate_in_background, name, on_done)
@@ -0,0 +1,101 @@
+"""The contact message inbox: folders, read/archived state and retention.
+
+Every folder is listed newest first with keyset pages, each an index range
+scan (see the ContactMessage indexes). The public contact form is a spam
+target, so the table is kept bounded by apply_retention(), run daily by the
+purge_contact_messages command.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ContactMessage
+
+INBOX = 'inbox'
+UNREAD = 'unread'
+ARCHIVED = 'archived'
+FOLDERS = {
+    INBOX: Q(is_archived=False),
+    UNREAD: Q(is_read=False, is_archived=False),
+    ARCHIVED: Q(is_archived=True),
+}
+INBOX_ORDERING = ('-submitted_at', '-id')
+INBOX_PAGE_SIZE = 25
+
+DELETE = 'delete'
+ACTIONS = {
+    'read': {'is_read': True},
+    'unread': {'is_read': False},
+    'archive': {'is_archived': True},
+    'unarchive': {'is_archived': False},
+    DELETE: None,
+}
+
+
+def folder_messages(folder, query=''):
+    """The messages of ``folder``; ``query`` narrows them to a name, email or text match."""
+    if folder not in FOLDERS:
+        raise ValueError(f'Unknown folder: {folder!r}')
+    messages = ContactMessage.objects.filter(FOLDERS[folder])
+    if query:
+        # A LIKE filter, but it only runs until a page is full.
+        messages = messages.filter(
+            Q(name__icontains=query) | Q(email__icontains=query) | Q(message__icontains=query)
+        )
+    return messages
+
+
+def unread_count():
+    # Counted off contact_unread_idx alone.
+    return ContactMessage.objects.filter(FOLDERS[UNREAD]).count()
+
+
+def update_messages(action, ids):
+    """Apply ``action`` to the messages with ``ids``; returns how many changed."""
+    if action not in ACTIONS:
+        raise ValueError(f'Unknown action: {action!r}')
+    messages = ContactMessage.objects.filter(pk__in=ids)
+    if action == DELETE:
+        return messages.delete()[0]
+    return messages.update(**ACTIONS[action])
+
+
+def _in_batches(queryset, apply, batch_size, pause):
+    """Run ``apply`` on ``queryset``, oldest first, one short transaction per batch.
+
+    Each batch holds the write lock only for its own rows; ``pause`` seconds
+    between batches let the site's writes in.
+    """
+    done = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('submitted_at', 'id').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return done
+            apply(ContactMessage.objects.filter(pk__in=ids))
+        done += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def apply_retention(archive_days=None, delete_days=None, batch_size=500, pause=0.05):
+    """Archive messages older than ``archive_days`` and delete those older than ``delete_days``.
+
+    Either step is skipped when its age is None. Returns (archived, deleted).
+    """
+    now = timezone.now()
+    archived = deleted = 0
+    if delete_days is not None:
+        deleted = _in_batches(
+            ContactMessage.objects.filter(submitted_at__lt=now - timedelta(days=delete_days)),
+            lambda batch: batch.delete(), batch_size, pause,
+        )
+    if archive_days is not None:
+        archived = _in_batches(
+            ContactMessage.objects.filter(is_archived=False, submitted_at__lt=now - timedelta(days=archive_days)),
+            lambda batch: batch.update(is_archived=True), batch_size, pause,
+        )
+    return archived, deleted
@@ -0,0 +1,165 @@
+"""In-process request metrics.
+
+PerformanceMiddleware (events/middleware.py) fills a RequestMetrics for every
+request and folds it into per-URL-name histograms here. Everything is plain
+counters behind one lock, cheap enough to leave on in production. The numbers
+are per process; each worker reports its own.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+# Upper bucket bounds; a value lands in the first bucket it does not exceed.
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, float('inf'))
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf'))
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return self.max if bound == float('inf') else bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': {str(bound): count for bound, count in zip(self.bounds, self.counts) if count},
+        }
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute_wrapper: count and time the queries of the current request.
+
+    Installed on every connection rather than per request, as async views
+    run their queries on connections of other threads; the request's
+    metrics follow them there through the context variable.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ViewStats:
+    def __init__(self):
+        self.wall_ms = Histogram(MS_BUCKETS)
+        self.db_ms = Histogram(MS_BUCKETS)
+        self.template_ms = Histogram(MS_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.response_bytes = Histogram(BYTES_BUCKETS)
+
+    def as_dict(self):
+        return {name: histogram.as_dict() for name, histogram in vars(self).items()}
+
+
+class StatsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, wall, metrics, size):
+        with self._lock:
+            stats = self._views.get(view_name)
+            if stats is None:
+                stats = self._views[view_name] = ViewStats()
+            stats.wall_ms.observe(wall * 1000)
+            stats.db_ms.observe(metrics.db_time * 1000)
+            stats.template_ms.observe(metrics.template_time * 1000)
+            stats.queries.observe(metrics.queries)
+            if size is not None:
+                stats.response_bytes.observe(size)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._views.items())}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = StatsRegistry()
+
+
+class InstrumentedTemplate:
+    """Wraps a backend template to add its render time to the current request."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return self._template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing top-level renders for the metrics."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
@@ -0,0 +1,94 @@
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count, Q
+
+from events.bench.runner import benchmark_database
+from events.bench.seed import seed_clubs, seed_events
+from events.bookings import cancel_booking, reserve_seat
+from events.models import Booking, Event
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Hammer one event with concurrent bookings and cancellations and check it never oversells.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=400, help='Booking attempts in total.')
+        parser.add_argument('--seats', type=int, default=100)
+
+    def handle(self, *args, **options):
+        threads, seats = options['threads'], options['seats']
+        per_thread = options['attempts'] // threads
+        errors = []
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                benchmark_database(sqlite_file=Path(tmp) / 'bench_bookings.sqlite3'):
+            event = seed_events(1, seed_clubs(1), days_back=0)[0]
+            Event.objects.filter(pk=event.pk).update(total_seats=seats, approved=True)
+
+            def book(worker):
+                try:
+                    for i in range(per_thread):
+                        try:
+                            reserve_seat(event, f'user{worker}-{i}', f'user{worker}-{i}@example.com')
+                        except OperationalError as exc:
+                            errors.append(exc)
+                finally:
+                    connection.close()
+
+            elapsed = run_threads(threads, book)
+            attempts = per_thread * threads
+            self.stdout.write(f'{attempts - len(errors)} bookings in {elapsed:.2f}s '
+                              f'({(attempts - len(errors)) / elapsed:.0f} bookings/s), {len(errors)} errors')
+            self.verify(event, seats)
+
+            confirmed = list(Booking.objects.filter(event=event, status=Booking.CONFIRMED).values_list('pk', flat=True))
+            to_cancel = random.Random(0).sample(confirmed, len(confirmed) // 2)
+            chunks = [to_cancel[i::threads] for i in range(threads)]
+
+            def cancel(worker):
+                try:
+                    for booking in Booking.objects.filter(pk__in=chunks[worker]):
+                        try:
+                            cancel_booking(booking)
+                        except OperationalError as exc:
+                            errors.append(exc)
+                finally:
+                    connection.close()
+
+            elapsed = run_threads(threads, cancel)
+            self.stdout.write(f'{len(to_cancel)} cancellations in {elapsed:.2f}s '
+                              f'({len(to_cancel) / elapsed:.0f} cancellations/s)')
+            self.verify(event, seats)
+
+    def verify(self, event, seats):
+        counts = Booking.objects.filter(event=event).aggregate(
+            confirmed=Count('id', filter=Q(status=Booking.CONFIRMED)),
+            waitlisted=Count('id', filter=Q(status=Booking.WAITLISTED)),
+        )
+        event.refresh_from_db(fields=['seats_booked'])
+        self.stdout.write(f"  confirmed {counts['confirmed']}/{seats}, waitlisted {counts['waitlisted']}, "
+                          f'seats_booked {event.seats_booked}')
+        if counts['confirmed'] > seats:
+            raise CommandError(f"Oversold: {counts['confirmed']} confirmed bookings for {seats} seats.")
+        if counts['confirmed'] != event.seats_booked:
+            raise CommandError('seats_booked does not match the confirmed bookings.')
+        if counts['waitlisted'] and counts['confirmed'] < seats:
+            raise CommandError('Seats are free while bookings are still waitlisted.')
+        self.stdout.write(self.style.SUCCESS('  no overselling'))
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from events.bench.runner import benchmark_database, format_summary, summarize, time_requests
+from events.bench.seed import seed_clubs, seed_events
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the public homepage with and without the fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=3000)
+        parser.add_argument('--clubs', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            clubs = seed_clubs(options['clubs'])
+            seed_events(options['events'], clubs, seed=options['seed'])
+            client = Client()
+            client.get('/')  # warm up imports and the template loader
+
+            self.stdout.write(f"Homepage, {options['events']} events, {options['requests']} requests")
+            uncached = summarize(time_requests(client, '/', options['requests'], before_each=cache.clear))
+            self.stdout.write(format_summary('uncached', uncached))
+            cache.clear()
+            client.get('/')
+            cached = summarize(time_requests(client, '/', options['requests']))
+            self.stdout.write(format_summary('cached', cached))
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                client.get('/')
+            self.stdout.write(f'queries      {len(queries)} per uncached request')
+            self.stdout.write(f"speedup      {cached['rps'] / uncached['rps']:.1f}x")
@@ -0,0 +1,111 @@
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events.bench.compare import regressions
+from events.bench.load import live_server, run_load, session_cookie
+from events.bench.queries import record_queries
+from events.bench.routes import clients, routes
+from events.bench.runner import benchmark_database, peak_rss_kb, summarize
+from events.bench.seed import seed_dataset
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every events route through the test client and under concurrent load '
+            'against a local server; write the results as JSON and compare them to a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clubs', type=int, default=20)
+        parser.add_argument('--events', type=int, default=1000)
+        parser.add_argument('--feedback', type=int, default=2000)
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=50, help='Test client requests per route.')
+        parser.add_argument('--load-requests', type=int, default=200, help='Server requests per route.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--no-server', action='store_true', help='Skip the live server load run.')
+        parser.add_argument('--only', nargs='*', metavar='ROUTE', help='Benchmark only these route names.')
+        parser.add_argument('--output', default='bench-results.json')
+        parser.add_argument('--baseline', help='A previous --output file to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown tolerated before flagging a regression.')
+
+    def handle(self, *args, **options):
+        results = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                **{key: options[key] for key in ('clubs', 'events', 'feedback', 'messages', 'seed',
+                                                 'requests', 'load_requests', 'concurrency')},
+            },
+            'client': {},
+            'server': {},
+        }
+        # A file database, so that the server's threads can share it.
+        with tempfile.TemporaryDirectory() as tmp, \
+                benchmark_database(sqlite_file=Path(tmp) / 'bench_routes.sqlite3'):
+            data = seed_dataset(clubs=options['clubs'], events=options['events'],
+                                feedback=options['feedback'], messages=options['messages'],
+                                seed=options['seed'])
+            users = clients(data)
+            selected = [route for route in routes(data) if not options['only'] or route.name in options['only']]
+
+            self.stdout.write(f"Test client, {options['requests']} requests per route")
+            for route in selected:
+                results['client'][route.name] = self.bench_client(route, users[route.user], options['requests'])
+                self.write_line(route.name, results['client'][route.name])
+
+            if not options['no_server']:
+                self.stdout.write(f"Live server, {options['load_requests']} requests per route, "
+                                  f"{options['concurrency']} concurrent")
+                with live_server() as base_url:
+                    for route in selected:
+                        if route.mutating or route.post_data is not None:
+                            continue
+                        timings, elapsed, errors = run_load(
+                            base_url + route.path, options['load_requests'], options['concurrency'],
+                            cookie=session_cookie(users[route.user]),
+                        )
+                        results['server'][route.name] = {**summarize(timings, elapsed), 'errors': errors}
+                        self.write_line(route.name, results['server'][route.name])
+
+        results['peak_rss_kb'] = peak_rss_kb()
+        Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True))
+        self.stdout.write(f"Peak RSS {results['peak_rss_kb']} KiB; results written to {options['output']}")
+
+        if options['baseline']:
+            found = regressions(results, json.loads(Path(options['baseline']).read_text()),
+                                options['threshold'])
+            for line in found:
+                self.stdout.write(self.style.ERROR(f'  {line}'))
+            if found:
+                raise CommandError(f'{len(found)} regressions against {options["baseline"]}.')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def bench_client(self, route, client, count):
+        """Time ``count`` requests, each rolled back so mutating routes can repeat."""
+        timings, errors = [], 0
+        for warm_up in (True, *[False] * count):
+            with transaction.atomic():
+                with record_queries(with_stacks=False) as log:
+                    started = time.perf_counter()
+                    response = route.request(client)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if warm_up:
+                continue
+            timings.append(elapsed)
+            errors += response.status_code >= 400
+        return {**summarize(timings), 'queries': len(log), 'errors': errors}
+
+    def write_line(self, name, summary):
+        queries = f"   {summary['queries']} queries" if 'queries' in summary else ''
+        self.stdout.write(f"  {name:<24} {summary['rps']:>8.1f} req/s   p50 {summary['p50_ms']:7.2f} ms   "
+                          f"p95 {summary['p95_ms']:7.2f} ms   p99 {summary['p99_ms']:7.2f} ms"
+                          f"{queries}{'   ' + str(summary['errors']) + ' errors' if summary['errors'] else ''}")
@@ -0,0 +1,76 @@
+import random
+import time
+from datetime import time as clock, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.bench.runner import benchmark_database, format_summary, summarize
+from events.bench.seed import VENUES, seed_clubs, seed_events
+from events.models import Event
+from events.moderation import approval_conflicts
+from events.scheduling import conflicting_events, suggest_slots
+
+
+def requested_slots(count, rng, days_ahead=365):
+    """Random (venue, date, start, end) requests like the add event form sends."""
+    today = timezone.localdate()
+    slots = []
+    for _ in range(count):
+        start = rng.randint(8, 18)
+        slots.append((rng.choice(VENUES), today + timedelta(days=rng.randint(1, days_ahead)),
+                      clock(start), clock(start + rng.randint(1, 3))))
+    return slots
+
+
+def scan_conflicts(venue, date, start_time, end_time):
+    """The per-submission scan the index replaces: every event, checked in Python."""
+    return [
+        event for event in Event.objects.only('venue', 'date', 'start_time', 'end_time')
+        if event.venue.lower() == venue.lower() and event.date == date
+        and event.start_time < end_time and event.end_time > start_time
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark venue conflict checks, free slot suggestions and bulk approval checks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=50_000)
+        parser.add_argument('--clubs', type=int, default=50)
+        parser.add_argument('--checks', type=int, default=1000)
+        parser.add_argument('--scan-checks', type=int, default=20,
+                            help='Full scans are slow; time fewer of them.')
+        parser.add_argument('--batch', type=int, default=1000, help='Pending events approved at once.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        slots = requested_slots(options['checks'], rng)
+        with benchmark_database():
+            seed_events(options['events'], seed_clubs(options['clubs']), seed=options['seed'])
+            conflicting_events(*slots[0])  # warm up
+
+            self.stdout.write(f"Scheduling, {options['events']} events at {len(VENUES)} venues, "
+                              f"{len(slots)} requests")
+            self.stdout.write(format_summary('conflicts', summarize(self.time(conflicting_events, slots))))
+            self.stdout.write(format_summary('suggestions', summarize(self.time(suggest_slots, slots))))
+            self.stdout.write(format_summary(
+                'full scan', summarize(self.time(scan_conflicts, slots[:options['scan_checks']]))))
+            conflicts = sum(bool(conflicting_events(*slot)) for slot in slots)
+            self.stdout.write(f'conflicts    {conflicts / len(slots):.0%} of requests')
+
+            pending = list(Event.objects.filter(approved=False).values_list('pk', flat=True)[:options['batch']])
+            started = time.perf_counter()
+            conflicting = approval_conflicts(pending)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'bulk approve {len(pending)} pending events checked in {elapsed * 1000:.1f} ms, '
+                              f'{len(conflicting)} conflicting')
+
+    def time(self, check, slots):
+        timings = []
+        for slot in slots:
+            started = time.perf_counter()
+            check(*slot)
+            timings.append(time.perf_counter() - started)
+        return timings
@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from events.bench.runner import benchmark_database, format_summary, summarize
+from events.bench.seed import seed_clubs, seed_events
+from events.models import Event
+from events.search import SEARCH_COLUMNS, rebuild_search_index, search_events, search_supported
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'vo', 'zu', 'shi', 'pre', 'dan', 'mor', 'lek', 'tis', 'bar',
+             'gon', 'fel', 'qua', 'sir', 'ne', 'pol']
+
+
+def vocabulary(size, rng):
+    """``size`` distinct made-up words of two to four syllables."""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def typed_queries(words, count, rng):
+    """What type-ahead sends: growing prefixes of one or two words."""
+    queries = []
+    while len(queries) < count:
+        phrase = ' '.join(rng.sample(words, rng.choice([1, 2])))
+        queries.extend(phrase[:length] for length in range(2, len(phrase) + 1))
+    return queries[:count]
+
+
+def like_search(query, limit):
+    """What search would cost without the index: icontains over every column."""
+    match = Q()
+    for column in SEARCH_COLUMNS:
+        match |= Q(**{'club__name__icontains' if column == 'club' else f'{column}__icontains': query})
+    return list(Event.objects.filter(match, approved=True).values('id', 'title')[:limit])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark type-ahead event search latency on the FTS5 index against LIKE scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100_000)
+        parser.add_argument('--clubs', type=int, default=50)
+        parser.add_argument('--words', type=int, default=5000, help='Size of the seeded vocabulary.')
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--like-queries', type=int, default=50,
+                            help='LIKE scans are slow; time fewer of them.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not search_supported():
+            raise CommandError('Event search needs an SQLite database.')
+        rng = random.Random(options['seed'])
+        words = vocabulary(options['words'], rng)
+        queries = typed_queries(words, options['queries'], rng)
+
+        with benchmark_database():
+            clubs = seed_clubs(options['clubs'])
+            started = time.perf_counter()
+            seed_events(options['events'], clubs, seed=options['seed'], vocabulary=words)
+            self.stdout.write(f"seeded       {options['events']} events in {time.perf_counter() - started:.1f} s "
+                              f"(indexed by the triggers)")
+            started = time.perf_counter()
+            rebuild_search_index()
+            self.stdout.write(f'rebuild      {time.perf_counter() - started:.1f} s')
+
+            search_events(queries[0])  # warm up the page cache
+            self.stdout.write(f"Search, {options['events']} events, {len(queries)} type-ahead queries")
+            self.stdout.write(format_summary('fts5', summarize(self.time(search_events, queries))))
+            like = summarize(self.time(like_search, queries[:options['like_queries']]))
+            self.stdout.write(format_summary('like', like))
+            hits = sum(bool(search_events(query)) for query in queries)
+            self.stdout.write(f'hit rate     {hits / len(queries):.0%} of queries return results')
+
+    def time(self, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query, 10)
+            timings.append(time.perf_counter() - started)
+        return timings
@@ -0,0 +1,123 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import F
+
+from events.bench.runner import summarize
+from events.models import Club, ContactMessage, Event, Feedback, User
+
+# Both profiles wait as long for a lock, so that the comparison is of the
+# backends and not of how patient they are.
+BUSY_TIMEOUT = 20
+PROFILES = {
+    'plain': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {'timeout': BUSY_TIMEOUT}},
+    'tuned': {'ENGINE': 'events.backends.sqlite3', 'OPTIONS': {'timeout': BUSY_TIMEOUT}},
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent write throughput and "database is locked" errors of the plain '
+            'SQLite backend and the tuned events.backends.sqlite3 one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help='Writes per writer thread.')
+        parser.add_argument('--readers', type=int, default=2)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile, overrides in PROFILES.items():
+                alias = f'bench_{profile}'
+                self.add_database(alias, {**overrides, 'NAME': str(Path(tmp) / f'{profile}.sqlite3')})
+                try:
+                    call_command('migrate', database=alias, verbosity=0)
+                    self.report(profile, *self.run(alias, options))
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+
+    def add_database(self, alias, overrides):
+        default = connections.settings[DEFAULT_DB_ALIAS]
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: default,
+            alias: {key: value for key, value in overrides.items()},
+        })
+        connections.settings[alias] = configured[alias]
+
+    def run(self, alias, options):
+        user = User.objects.db_manager(alias).create_user('bench', 'bench@example.com', None, role='club')
+        club = Club.objects.using(alias).create(user=user, name='bench', contact_email=user.email)
+        event = Event.objects.using(alias).bulk_create([Event(
+            title='Bench', description='', club=club, date='2030-01-01', start_time='10:00',
+            end_time='12:00', total_seats=100, approved=True,
+        )])[0]
+
+        errors, write_timings, read_timings = [], [], []
+        writing = threading.Event()
+        writing.set()
+
+        def post_feedback(i):
+            # Read, then write, in one transaction: the pattern that deadlocks
+            # deferred SQLite transactions.
+            with transaction.atomic(using=alias):
+                Event.objects.using(alias).only('id').get(pk=event.pk)
+                Feedback.objects.using(alias).bulk_create([Feedback(event_id=event.pk, rating=i % 5 + 1,
+                                                                    comment='bench')])
+                Event.objects.using(alias).filter(pk=event.pk).update(feedback_count=F('feedback_count') + 1)
+
+        def post_message(i):
+            ContactMessage.objects.using(alias).create(name='bench', email='bench@example.com', message=str(i))
+
+        def writer(worker):
+            try:
+                for i in range(options['writes']):
+                    started = time.perf_counter()
+                    try:
+                        (post_feedback if i % 2 else post_message)(worker * options['writes'] + i)
+                    except OperationalError as exc:
+                        errors.append(exc)
+                    else:
+                        write_timings.append(time.perf_counter() - started)
+            finally:
+                connections[alias].close()
+
+        def reader(worker):
+            try:
+                while writing.is_set():
+                    started = time.perf_counter()
+                    try:
+                        Feedback.objects.using(alias).filter(event_id=event.pk).count()
+                    except OperationalError as exc:
+                        errors.append(exc)
+                    else:
+                        read_timings.append(time.perf_counter() - started)
+            finally:
+                connections[alias].close()
+
+        writers = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        readers = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        return options['writers'] * options['writes'], elapsed, write_timings, read_timings, errors
+
+    def report(self, profile, attempts, elapsed, write_timings, read_timings, errors):
+        self.stdout.write(f'{profile}: {len(write_timings)}/{attempts} writes in {elapsed:.2f}s, '
+                          f'{len(write_timings) / elapsed:.0f} writes/s, {len(errors)} errors '
+                          f'({len(errors) / attempts:.1%})')
+        for label, timings in (('writes', write_timings), ('reads', read_timings)):
+            if timings:
+                summary = summarize(timings)
+                self.stdout.write(f"  {label:<7} p50 {summary['p50_ms']:.2f} ms   p95 {summary['p95_ms']:.2f} ms"
+                                  f"   p99 {summary['p99_ms']:.2f} ms")
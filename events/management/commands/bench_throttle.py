@@ -0,0 +1,78 @@
+import logging
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from events.bench.runner import benchmark_database, summarize
+from events.throttling import CacheCounters, LocalCounters, check
+
+BACKENDS = {
+    'local': LocalCounters,
+    'cache': CacheCounters,
+}
+# Generous enough that every timed check is allowed and counts both rules.
+OPEN_RATES = {'ip': '1000000/m', 'endpoint': '1000000/m'}
+
+
+def addresses(count, rng):
+    return [f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}' for _ in range(count)]
+
+
+def format_us(label, summary):
+    return (f"{label:<12} p50 {summary['p50_ms'] * 1000:.1f} us   p95 {summary['p95_ms'] * 1000:.1f} us   "
+            f"p99 {summary['p99_ms'] * 1000:.1f} us")
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the per-request overhead of throttling the public form posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=100_000)
+        parser.add_argument('--addresses', type=int, default=10_000,
+                            help='Distinct client addresses the checks come from.')
+        parser.add_argument('--posts', type=int, default=300, help='Contact form posts per setting.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        clients = addresses(options['addresses'], rng)
+        attempts = [rng.choice(clients) for _ in range(options['checks'])]
+
+        self.stdout.write(f"Throttle checks, {len(attempts)} attempts from {len(clients)} addresses")
+        for label, backend in BACKENDS.items():
+            counters = backend()
+            timings = []
+            for address in attempts:
+                started = time.perf_counter()
+                check(counters, 'bench', address, OPEN_RATES)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(format_us(label, summarize(timings)))
+
+        # Not a warning per rejected post.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        with benchmark_database():
+            path = reverse('index')
+            posts = [{'name': f'Visitor {n}', 'email': f'visitor{n}@example.com', 'message': 'Hello'}
+                     for n in range(options['posts'])]
+            self.stdout.write(f"\nContact form posts through the full stack, {len(posts)} each")
+            for label, rates in (('unthrottled', {}), ('allowed', {'contact': OPEN_RATES}),
+                                 ('rejected', {'contact': {'ip': '0/m'}})):
+                with override_settings(THROTTLE_RATES=rates):
+                    timings, queries, statuses = self.post(Client(), path, posts, clients)
+                self.stdout.write(f"{format_us(label, summarize(timings))}   "
+                                  f"{queries / len(posts):.1f} queries/post   status {sorted(statuses)}")
+
+    def post(self, client, path, posts, clients):
+        timings, statuses = [], set()
+        with CaptureQueriesContext(connection) as queries:
+            for data, address in zip(posts, clients):
+                started = time.perf_counter()
+                response = client.post(path, data, REMOTE_ADDR=address)
+                timings.append(time.perf_counter() - started)
+                statuses.add(response.status_code)
+        return timings, len(queries), statuses
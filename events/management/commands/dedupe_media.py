@@ -0,0 +1,81 @@
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Now
+
+from events.cache import HOMEPAGE_FRAGMENTS, bump_fragment_versions
+from events.images import RENDITION_FORMATS, RENDITION_WIDTHS, generate_renditions, rendition_name
+from events.models import Event
+from events.storage import content_addressed_storage as storage
+
+UPLOAD_DIR = 'event_images'
+
+
+class Command(BaseCommand):
+    help = ('Move event images to content-addressed names, so identical files are stored once, '
+            'and delete files no event references.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without changing it.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        moved = self.migrate_references(dry_run)
+        freed, count = self.collect_garbage(dry_run)
+        if moved and not dry_run:
+            bump_fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+        prefix = 'Would have ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}re-pointed {moved} events and deleted {count} unreferenced files ({freed / 1024:.0f} KB).'
+        ))
+
+    def migrate_references(self, dry_run):
+        moved = 0
+        names = Event.objects.exclude(image='').exclude(image=None).values_list('image', flat=True).distinct()
+        for name in list(names):
+            if not storage.exists(name):
+                self.stderr.write(f'{name}: missing, left as is')
+                continue
+            with storage.open(name, 'rb') as source:
+                content = File(source, name)
+                new_name = storage.hashed_name(name, content)
+                if new_name == name:
+                    continue
+                if not dry_run:
+                    new_name = storage.save(name, content)
+            updated = Event.objects.filter(image=name)
+            moved += updated.count() if dry_run else updated.update(image=new_name, updated_at=Now())
+            if not dry_run:
+                generate_renditions(new_name)
+            self.stdout.write(f'{name} -> {new_name}')
+        return moved
+
+    def collect_garbage(self, dry_run):
+        referenced = set(Event.objects.exclude(image='').exclude(image=None).values_list('image', flat=True))
+        # Renditions of a referenced image are kept with it.
+        referenced |= {
+            rendition_name(name, width, ext)
+            for name in list(referenced) for width in RENDITION_WIDTHS for ext in RENDITION_FORMATS
+        }
+        freed = count = 0
+        root = storage.path(UPLOAD_DIR)
+        for directory, subdirs, files in os.walk(root):
+            relative_dir = posixpath.join(UPLOAD_DIR, *os.path.relpath(directory, root).split(os.sep)).rstrip('/.')
+            for filename in files:
+                name = posixpath.join(relative_dir, filename)
+                # A recent file may belong to an upload whose event is not saved yet.
+                if name in referenced or storage.recently_saved(name):
+                    continue
+                size = storage.size(name)
+                if not dry_run:
+                    # Under the lock, so that an upload cannot reuse it meanwhile.
+                    with storage.lock():
+                        if storage.recently_saved(name):
+                            continue
+                        storage.delete(name)
+                freed += size
+                count += 1
+                self.stdout.write(f'unreferenced: {name}')
+        return freed, count
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from events.writebehind import get_queue
+
+
+class Command(BaseCommand):
+    help = 'Insert the write-behind rows spooled by processes that are no longer running.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Also take over the spool files of running processes; '
+                                 'use only when no web process is up.')
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        recovered = queue.recover(everything=options['all'])
+        written = queue.flush()
+        self.stdout.write(f'Recovered {recovered} spooled rows, wrote {written}.')
+        if queue.stats()['queue_depth']:
+            self.stderr.write(f"{queue.stats()['queue_depth']} rows could not be written; "
+                              'their spool files were kept.')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from events.cache import HOMEPAGE_FRAGMENTS, bump_fragment_versions
+from events.images import generate_renditions
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive renditions of every event image.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help='Regenerate existing renditions too.')
+
+    def handle(self, *args, **options):
+        names = Event.objects.exclude(image='').exclude(image=None).values_list('image', flat=True).distinct()
+        written = recorded = 0
+        for name in names.iterator():
+            try:
+                files, events = generate_renditions(name, overwrite=options['overwrite'])
+            except OSError as exc:
+                self.stderr.write(f'{name}: {exc}')
+                continue
+            written += files
+            recorded += events
+        if written or recorded:
+            bump_fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} renditions.'))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.inbox import apply_retention
+
+
+class Command(BaseCommand):
+    help = ('Archive contact messages older than CONTACT_MESSAGE_ARCHIVE_DAYS and delete those older than '
+            'CONTACT_MESSAGE_RETENTION_DAYS, in small batches. Meant to run daily.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-days', type=int, default=settings.CONTACT_MESSAGE_ARCHIVE_DAYS)
+        parser.add_argument('--delete-days', type=int, default=settings.CONTACT_MESSAGE_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        archived, deleted = apply_retention(options['archive_days'], options['delete_days'],
+                                            batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} and deleted {deleted} contact messages.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute the feedback count, rating sum and histogram of every event.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        corrected = rebuild_rating_aggregates(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected the rating aggregates of {corrected} events.'))
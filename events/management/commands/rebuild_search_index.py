@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from events.search import rebuild_search_index, search_supported
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text event search index, its triggers and its contents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if not search_supported(options['database']):
+            raise CommandError('Event search needs an SQLite database.')
+        indexed = rebuild_search_index(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} events.'))
@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from events.cache import HOMEPAGE_FRAGMENTS, bump_fragment_versions
+from events.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database onto every replica in REPLICA_DATABASES; '
+            'stands in for real replication when running replicas locally.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep syncing every this many seconds instead of once.')
+
+    def handle(self, *args, **options):
+        if not replica_aliases():
+            raise CommandError('REPLICA_DATABASES is empty.')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas only copies SQLite databases.')
+
+        while True:
+            started = time.perf_counter()
+            primary.ensure_connection()
+            changed = set()
+            for alias in replica_aliases():
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    before = self.table_states(target)
+                    # The online backup API copies a consistent snapshot page by
+                    # page, while the primary keeps serving writes.
+                    primary.connection.backup(target)
+                    changed.update(name for name, state in self.table_states(target).items()
+                                   if state != before[name])
+                finally:
+                    target.close()
+            # Fragments rendered from the old replica data must not outlive it.
+            bump_fragment_versions(*(fragment for name in sorted(changed) for fragment in HOMEPAGE_FRAGMENTS[name]))
+            self.stdout.write(f'Synced {len(replica_aliases())} replicas in '
+                              f'{(time.perf_counter() - started) * 1000:.0f} ms; '
+                              f"changed: {', '.join(sorted(changed)) or 'nothing cached'}")
+            if not options['interval']:
+                break
+            primary.close()
+            time.sleep(options['interval'])
+
+    def table_states(self, connection):
+        """For each model in HOMEPAGE_FRAGMENTS, a summary of its table that
+        any insert, edit or delete changes: ids only grow and every save sets
+        updated_at."""
+        states = {}
+        for name in HOMEPAGE_FRAGMENTS:
+            opts = apps.get_model('events', name)._meta
+            try:
+                states[name] = connection.execute(
+                    f'SELECT count(*), max("{opts.pk.column}"), max("updated_at") FROM "{opts.db_table}"'
+                ).fetchone()
+            except sqlite3.OperationalError:  # a replica that was never synced
+                states[name] = None
+        return states
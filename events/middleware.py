@@ -0,0 +1,123 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import RequestMetrics, current_metrics, registry
+from .routers import replica_aliases, replica_reads
+
+
+class HybridMiddleware:
+    """Base for middleware that runs natively in both sync and async stacks.
+
+    Subclasses implement ``handle`` for sync stacks and ``ahandle`` for async
+    ones; which one runs follows from the type of ``get_response``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.ahandle(request)
+        return self.handle(request)
+
+
+class PerformanceMiddleware(HybridMiddleware):
+    """Record wall time, queries, DB time, template time and size per URL name.
+
+    Also reports the request's numbers in a Server-Timing header unless
+    PERFORMANCE_SERVER_TIMING is False.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+
+    def handle(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def ahandle(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        wall = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or '<unresolved>'
+        size = None if response.streaming else len(response.content)
+        registry.record(view_name, wall, metrics, size)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'total;dur={wall * 1000:.1f}, '
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+                f'tpl;dur={metrics.template_time * 1000:.1f}'
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Let anonymous, read-only requests read from the replicas.
+
+    Requests with a session cookie (logged-in admins and clubs) and unsafe
+    methods read from the primary. So does every request for
+    REPLICA_STICKY_SECONDS after an unsafe one, so that replication lag
+    never hides someone's own write from them.
+    """
+
+    cookie_name = 'primary_until'
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 30)
+
+    def handle(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return self.stick(self.get_response(request))
+        if not self.may_use_replica(request):
+            return self.get_response(request)
+        with replica_reads():
+            return self.get_response(request)
+
+    async def ahandle(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return self.stick(await self.get_response(request))
+        if not self.may_use_replica(request):
+            return await self.get_response(request)
+        with replica_reads():
+            return await self.get_response(request)
+
+    def may_use_replica(self, request):
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return False
+        try:
+            return int(request.COOKIES.get(self.cookie_name, 0)) <= time.time()
+        except ValueError:
+            return True
+
+    def stick(self, response):
+        response.set_cookie(self.cookie_name, int(time.time()) + self.sticky_seconds,
+                            max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['date', 'start_time'], name='event_approved_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['club', 'date'], name='event_club_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['-date'], name='event_pending_date_idx'),
+        ),
+    ]
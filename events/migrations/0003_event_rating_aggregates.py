@@ -0,0 +1,75 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+RATING_FIELDS = ('feedback_count', 'rating_sum', *(f'rating_{stars}_count' for stars in RATING_VALUES))
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    """Fill the new columns from the feedback rows; they start at 0."""
+    Event = apps.get_model('events', 'Event')
+    Feedback = apps.get_model('events', 'Feedback')
+    db = schema_editor.connection.alias
+    totals = (
+        Feedback.objects.using(db).order_by().values('event')
+        .annotate(
+            feedback_count=models.Count('id'),
+            rating_sum=models.Sum('rating'),
+            **{f'rating_{stars}_count': models.Count('id', filter=models.Q(rating=stars)) for stars in RATING_VALUES},
+        )
+    )
+    batch = []
+    for row in totals.iterator(chunk_size=500):
+        batch.append(Event(pk=row.pop('event'), **row))
+        if len(batch) == 500:
+            Event.objects.using(db).bulk_update(batch, RATING_FIELDS)
+            batch = []
+    Event.objects.using(db).bulk_update(batch, RATING_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='feedback_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['event', '-submitted_at', '-id'], name='feedback_event_recent_idx'),
+        ),
+    ]
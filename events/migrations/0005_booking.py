@@ -0,0 +1,35 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_feedback_event_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_booked',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmed'), ('waitlisted', 'Waitlisted'), ('cancelled', 'Cancelled')], max_length=10)),
+                ('cancel_token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='events.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'status', 'created_at', 'id'], name='booking_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:51
+
+from django.db import migrations, models
+import events.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_booking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=events.storage.ContentAddressedStorage(), upload_to='event_images/'),
+        ),
+    ]
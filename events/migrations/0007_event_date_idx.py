@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_image_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'start_time'], name='event_date_idx'),
+        ),
+    ]
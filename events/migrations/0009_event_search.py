@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# The index as this migration first creates it. The triggers that keep it
+# current are installed after every migrate by
+# events.search.install_search_triggers, as SQLite drops them whenever a
+# later migration rebuilds events_event.
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE events_event_search USING fts5("
+    "title, description, guest, venue, club, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+FILL_INDEX = (
+    "INSERT INTO events_event_search (rowid, title, description, guest, venue, club) "
+    "SELECT e.id, e.title, e.description, e.guest, e.venue, c.name "
+    "FROM events_event e JOIN events_club c ON c.id = e.club_id"
+)
+OPTIMIZE_INDEX = "INSERT INTO events_event_search (events_event_search) VALUES ('optimize')"
+TRIGGERS = ('insert', 'update', 'delete', 'club_update')
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in (CREATE_INDEX, FILL_INDEX, OPTIMIZE_INDEX):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS events_event_search_{trigger}')
+    schema_editor.execute('DROP TABLE IF EXISTS events_event_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:17
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(django.db.models.functions.text.Lower('venue'), models.F('date'), models.F('start_time'), name='event_venue_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_contact_message_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
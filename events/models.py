@@ -1,8 +1,14 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.db import models
 
+from .storage import content_addressed_storage
+
 
 # Create your models here.
 
@@ -25,6 +31,7 @@ class Club(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     contact_email = models.EmailField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -32,6 +39,12 @@ class Club(models.Model):
 
 from django.db import models
 
+RATING_VALUES = range(1, 6)
+RATING_FIELDS = ('feedback_count', 'rating_sum', *(f'rating_{stars}_count' for stars in RATING_VALUES))
+# Columns only ever changed through F() updates; see Event.save().
+COUNTER_FIELDS = (*RATING_FIELDS, 'seats_booked')
+
+
 class Event(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -42,20 +55,93 @@ class Event(models.Model):
     end_time = models.TimeField()
     total_seats = models.PositiveIntegerField()
     guest = models.CharField(max_length=255, blank=True, help_text="Name of the guest speaker or chief guest (optional)")
-    image = models.ImageField(upload_to='event_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='event_images/', storage=content_addressed_storage, blank=True, null=True)
+    # The renditions written for ``image`` by events/images.py, as
+    # {'name': image name, 'webp': [widths], 'jpg': [widths]}, so that pages
+    # never ask the storage which files exist.
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     approved = models.BooleanField(default=False)
+    # Confirmed bookings, maintained by events/bookings.py.
+    seats_booked = models.PositiveIntegerField(default=0, editable=False)
+
+    # Feedback aggregates, maintained by events/signals.py and rebuilt by the
+    # rebuild_rating_aggregates command, so pages never scan feedback rows.
+    feedback_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Bumped by every change, including the F() updates of the counters
+    # above; drives the ETag/Last-Modified of the pages showing the event.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Homepage upcoming/past lists and the archive. Partial rather than
+            # leading with `approved`: Django emits a bare `WHERE "approved"`
+            # that SQLite can only match against an index condition.
+            models.Index(fields=['date', 'start_time'], name='event_approved_date_idx',
+                         condition=models.Q(approved=True)),
+            # Admin dashboard list across all statuses.
+            models.Index(fields=['date', 'start_time'], name='event_date_idx'),
+            # Club dashboard, manage events and club feedbacks.
+            models.Index(fields=['club', 'date'], name='event_club_date_idx'),
+            # Admin moderation queue; only the pending rows are indexed.
+            models.Index(fields=['-date'], name='event_pending_date_idx', condition=models.Q(approved=False)),
+            # Venue/time conflicts and free slots (events/scheduling.py).
+            models.Index(Lower('venue'), 'date', 'start_time', name='event_venue_slot_idx'),
+            # Feed Last-Modified (MAX) and sync deltas (events/feeds.py).
+            models.Index(fields=['updated_at'], name='event_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.club.name}"
 
+    def save(self, *args, **kwargs):
+        # Never write back counters read earlier: feedback or bookings may have
+        # arrived since, and the counters are only ever changed with F() updates.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def average_rating(self):
+        if not self.feedback_count:
+            return None
+        return self.rating_sum / self.feedback_count
+
+    @property
+    def seats_left(self):
+        return max(self.total_seats - self.seats_booked, 0)
+
+    @property
+    def rating_histogram(self):
+        """(stars, count) pairs from 5 stars down to 1."""
+        return [(stars, getattr(self, f'rating_{stars}_count')) for stars in reversed(RATING_VALUES)]
+
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 class Feedback(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='feedbacks')
     comment = models.TextField()
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, which bulk_create() would overwrite with the time the
+    # write-behind queue flushes (events/writebehind.py).
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first keyset pages of an event's feedback.
+            models.Index(fields=['event', '-submitted_at', '-id'], name='feedback_event_recent_idx'),
+        ]
+
     def __str__(self):
         return f"Feedback on {self.event.title} at {self.submitted_at.strftime('%Y-%m-%d %H:%M')}"
 
@@ -66,7 +152,85 @@ class ContactMessage(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
     message = models.TextField()
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add; see Feedback.submitted_at.
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
+    is_read = models.BooleanField(default=False)
+    is_archived = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Newest-first keyset pages of the inbox folders (events/inbox.py),
+            # and the retention job's oldest-first batches.
+            models.Index(fields=['-submitted_at', '-id'], name='contact_recent_idx'),
+            models.Index(fields=['-submitted_at', '-id'], name='contact_inbox_idx',
+                         condition=models.Q(is_archived=False)),
+            # Only unread rows, so the unread folder and count stay small
+            # however much has been read.
+            models.Index(fields=['-submitted_at', '-id'], name='contact_unread_idx',
+                         condition=models.Q(is_read=False, is_archived=False)),
+        ]
 
     def __str__(self):
         return f"Message from {self.name} ({self.email})"
+
+
+class EventTombstone(models.Model):
+    """A deleted event, so that feed clients syncing incrementally learn about it.
+
+    Written by a trigger on the event table (events/feeds.py), or by a
+    post_delete handler on databases other than SQLite, which also drop the
+    ones older than feeds.TOMBSTONE_DAYS.
+    """
+    event_id = models.BigIntegerField()
+    club_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Event {self.event_id} deleted at {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class BookingQuerySet(models.QuerySet):
+    def delete(self):
+        # Frees the seats of confirmed bookings. Bookings cascading from a
+        # deleted event are deleted without this, along with its counter.
+        from .bookings import release_seat
+
+        with transaction.atomic(using=self.db):
+            freed = list(self.filter(status=Booking.CONFIRMED).values_list('event_id', flat=True))
+            deleted = super().delete()
+            for event_id in freed:
+                release_seat(event_id)
+        return deleted
+
+
+class Booking(models.Model):
+    CONFIRMED = 'confirmed'
+    WAITLISTED = 'waitlisted'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = (
+        (CONFIRMED, 'Confirmed'),
+        (WAITLISTED, 'Waitlisted'),
+        (CANCELLED, 'Cancelled'),
+    )
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='bookings')
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    cancel_token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Waitlist promotion takes the oldest waitlisted booking of an event.
+            models.Index(fields=['event', 'status', 'created_at', 'id'], name='booking_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} for {self.event.title} ({self.status})"
+
+    def delete(self, *args, **kwargs):
+        deleted = Booking.objects.filter(pk=self.pk).delete()
+        self.pk = None
+        return deleted
@@ -0,0 +1,72 @@
+"""Approving and rejecting pending events in bulk."""
+from django.db import transaction
+from django.db.models.functions import Now
+
+from .cache import HOMEPAGE_FRAGMENTS, batched_invalidation, bump_fragment_versions
+from .models import Event
+from .scheduling import Schedule, pending_rows
+
+APPROVE = 'approve'
+REJECT = 'reject'
+
+# Per-ID outcomes.
+APPROVED = 'approved'
+REJECTED = 'rejected'
+CONFLICTING = 'conflicting'  # overlaps an approved event at the same venue
+NOT_PENDING = 'not_pending'
+NOT_FOUND = 'not_found'
+
+
+def moderate_events(action, ids=None, queryset=None):
+    """Approve or reject pending events, selected by ``ids`` or by ``queryset``.
+
+    Runs in one transaction with a single UPDATE (approve) or DELETE (reject)
+    and invalidates the homepage fragments once, after the commit. Events
+    that would overlap an approved one, or one approved earlier in the same
+    batch, are left pending. Returns {id: outcome}.
+    """
+    if action not in (APPROVE, REJECT):
+        raise ValueError(f'Unknown moderation action: {action!r}')
+    if (ids is None) == (queryset is None):
+        raise ValueError('Pass either ids or queryset.')
+
+    with batched_invalidation(), transaction.atomic():
+        if queryset is None:
+            queryset = Event.objects.filter(pk__in=ids)
+        states = dict(queryset.select_for_update().values_list('pk', 'approved'))
+        pending = [pk for pk, approved in states.items() if not approved]
+        results = {pk: NOT_FOUND for pk in ids or ()}
+        results.update({pk: NOT_PENDING for pk, approved in states.items() if approved})
+        if action == APPROVE and pending:
+            conflicting = approval_conflicts(pending)
+            results.update({pk: CONFLICTING for pk in conflicting})
+            pending = [pk for pk in pending if pk not in conflicting]
+
+        if pending:
+            targets = Event.objects.filter(pk__in=pending)
+            if action == APPROVE:
+                targets.update(approved=True, updated_at=Now())
+            else:
+                targets.delete()
+            # update() sends no post_save; the deletes' signals are batched.
+            bump_fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+            outcome = APPROVED if action == APPROVE else REJECTED
+            results.update({pk: outcome for pk in pending})
+    return results
+
+
+def approval_conflicts(pks):
+    """The pending events among ``pks`` that cannot be approved together.
+
+    Checked in date and time order, so the earlier of two overlapping
+    events is the one approved.
+    """
+    rows = pending_rows(Event.objects.filter(pk__in=pks))
+    schedule = Schedule.approved_between(rows[0][2], rows[-1][2])
+    conflicting = set()
+    for pk, *slot in rows:
+        if schedule.conflicts(*slot):
+            conflicting.add(pk)
+        else:
+            schedule.add(*slot)
+    return conflicting
@@ -0,0 +1,86 @@
+"""Keyset (seek) pagination.
+
+Unlike OFFSET paging, every page is a single index range scan starting right
+after the last row of the previous page, so page 1000 costs the same as page 1.
+Orderings must end in a unique column (usually ``id``) to be stable.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(obj, ordering):
+    values = [str(getattr(obj, field.lstrip('-'))) for field in ordering]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(model, ordering, cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise InvalidCursor(cursor)
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError, ValidationError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def keyset_filter(ordering, values):
+    """Q matching the rows that sort strictly after ``values`` in ``ordering``."""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {f.lstrip('-'): v for f, v in zip(ordering[:i], values[:i])}
+        condition |= Q(**equal, **{f'{name}__{lookup}': values[i]})
+    return condition
+
+
+def _page_queryset(queryset, ordering, cursor, page_size):
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(queryset.model, ordering, cursor)))
+    return queryset[:page_size + 1]
+
+
+def _make_page(items, ordering, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1], ordering)
+    return KeysetPage(items, next_cursor)
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20):
+    """Return the page of ``queryset`` that follows ``cursor``.
+
+    Raises InvalidCursor if the cursor cannot be decoded.
+    """
+    items = list(_page_queryset(queryset, ordering, cursor, page_size))
+    return _make_page(items, ordering, page_size)
+
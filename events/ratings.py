@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import RATING_FIELDS, RATING_VALUES, Event, Feedback
+
+
+def record_feedback(event_id, rating, sign=1):
+    """Add (sign=1) or remove (sign=-1) one rating from an event's aggregates.
+
+    A single UPDATE with F() expressions, so concurrent submissions never lose
+    counts.
+    """
+    changes = {
+        'feedback_count': F('feedback_count') + sign,
+        'rating_sum': F('rating_sum') + sign * rating,
+    }
+    if rating in RATING_VALUES:
+        changes[f'rating_{rating}_count'] = F(f'rating_{rating}_count') + sign
+    Event.objects.filter(pk=event_id).update(**changes, updated_at=Now())
+
+
+def record_feedback_batch(feedbacks):
+    """record_feedback() for many new Feedback rows: one UPDATE per event.
+
+    For writes that bypass the post_save signal, such as bulk_create().
+    """
+    deltas = defaultdict(Counter)
+    for feedback in feedbacks:
+        counter = deltas[feedback.event_id]
+        counter['feedback_count'] += 1
+        counter['rating_sum'] += feedback.rating
+        if feedback.rating in RATING_VALUES:
+            counter[f'rating_{feedback.rating}_count'] += 1
+    for event_id, counter in deltas.items():
+        Event.objects.filter(pk=event_id).update(**{field: F(field) + n for field, n in counter.items()},
+                                                 updated_at=Now())
+
+
+def rebuild_rating_aggregates(batch_size=500, using=DEFAULT_DB_ALIAS):
+    """Recompute every event's aggregates from the feedback table.
+
+    Only the events whose aggregates were wrong are written, with updated_at
+    bumped, so that their ETags and the feeds' sync tokens see the change.
+    Returns the number of events corrected.
+    """
+    totals = {
+        row.pop('event'): row
+        for row in Feedback.objects.using(using).order_by().values('event').annotate(
+            feedback_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{stars}_count': Count('id', filter=Q(rating=stars)) for stars in RATING_VALUES},
+        )
+    }
+    empty = dict.fromkeys(RATING_FIELDS, 0)
+    corrected = 0
+    with transaction.atomic(using=using):
+        events = Event.objects.using(using).only('pk', *RATING_FIELDS).order_by('pk')
+        batch = []
+        for event in events.iterator(chunk_size=batch_size):
+            values = totals.get(event.pk, empty)
+            if all(getattr(event, field) == values[field] for field in RATING_FIELDS):
+                continue
+            for field in RATING_FIELDS:
+                setattr(event, field, values[field])
+            event.updated_at = timezone.now()
+            batch.append(event)
+            if len(batch) == batch_size:
+                Event.objects.using(using).bulk_update(batch, [*RATING_FIELDS, 'updated_at'])
+                corrected += len(batch)
+                batch = []
+        Event.objects.using(using).bulk_update(batch, [*RATING_FIELDS, 'updated_at'])
+        corrected += len(batch)
+    return corrected
@@ -0,0 +1,59 @@
+"""Send the reads of anonymous page views to read replicas.
+
+Everything else — writes, management commands, background threads and any
+request that could be looking at data it has just written — uses the
+primary. ReplicaRoutingMiddleware (events/middleware.py) decides per request.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# The replica the current request reads from, picked once per request so that
+# all of its queries see the same snapshot.
+_replica = ContextVar('replica', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', ())
+
+
+@contextmanager
+def replica_reads():
+    """Let the reads of the block go to one of the replicas."""
+    token = _replica.set(random.choice(replica_aliases()))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def _primary_for_replica_instances(hints):
+    # Objects read from a replica are written to, and read through, the
+    # primary. Anything else (no instance, or an extra database a command
+    # set up) is left to Django: the instance's database, else the default.
+    instance = hints.get('instance')
+    if instance is not None and instance._state.db in replica_aliases():
+        return DEFAULT_DB_ALIAS
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get() or _primary_for_replica_instances(hints)
+
+    def db_for_write(self, model, **hints):
+        return _primary_for_replica_instances(hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas are copies of the primary, so objects from any of them mix.
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema along with the data from sync_replicas.
+        return db not in replica_aliases()
@@ -0,0 +1,164 @@
+"""Venue and time conflicts between events, and free slots to suggest instead.
+
+Two events conflict when they share a venue (case-insensitively) and a date
+and their times overlap; one ending when the other starts is fine. Pending
+events count as well as approved ones when an event is added or edited, so
+two clubs cannot both get a slot while waiting for approval. At approval only
+approved events count, for the conflicts and the suggested slots alike: of
+two overlapping pending events, the first approved wins. Rejected events are
+deleted and never count.
+
+Every lookup is a seek on event_venue_slot_idx, (LOWER(venue), date,
+start_time), followed by the few events of that venue and day.
+"""
+from bisect import insort
+from collections import defaultdict, namedtuple
+from datetime import time, timedelta
+
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import Event
+
+Slot = namedtuple('Slot', 'date start_time end_time')
+
+# Free slots are only suggested within opening hours, and only this many
+# days ahead of the requested date.
+DAY_START = time(8)
+DAY_END = time(22)
+SUGGESTION_DAYS = 7
+SUGGESTIONS = 3
+
+
+def at_venue(venue):
+    """Events at ``venue``, matched the way event_venue_slot_idx is built."""
+    return Event.objects.alias(venue_key=Lower('venue')).filter(venue_key=Lower(Value(venue)))
+
+
+def conflicting_events(venue, date, start_time, end_time, exclude=None, approved_only=False):
+    """The events overlapping ``start_time``-``end_time`` at ``venue`` on ``date``."""
+    events = at_venue(venue).filter(date=date, start_time__lt=end_time, end_time__gt=start_time)
+    if exclude is not None:
+        events = events.exclude(pk=exclude)
+    if approved_only:
+        events = events.filter(approved=True)
+    return list(events.only('id', 'title', 'start_time', 'end_time', 'approved').order_by('start_time'))
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def _free_gaps(busy, opens, closes):
+    """(start, end) minutes not covered by the sorted ``busy`` intervals."""
+    cursor = opens
+    for start, end in busy:
+        if start > cursor:
+            yield cursor, min(start, closes)
+        cursor = max(cursor, end)
+        if cursor >= closes:
+            return
+    if cursor < closes:
+        yield cursor, closes
+
+
+def suggest_slots(venue, date, start_time, end_time, exclude=None, approved_only=False, count=SUGGESTIONS):
+    """Up to ``count`` free slots as long as the requested one, nearest first.
+
+    Looks at the requested day first, then the following SUGGESTION_DAYS - 1
+    days, preferring start times close to the requested one. Never suggests
+    a time that has already passed.
+    """
+    duration = _minutes(end_time) - _minutes(start_time)
+    wanted = _minutes(start_time)
+    events = at_venue(venue).filter(date__gte=date, date__lt=date + timedelta(days=SUGGESTION_DAYS))
+    if exclude is not None:
+        events = events.exclude(pk=exclude)
+    if approved_only:
+        events = events.filter(approved=True)
+    busy = defaultdict(list)
+    for day, start, end in events.order_by('date', 'start_time').values_list('date', 'start_time', 'end_time'):
+        busy[day].append((_minutes(start), _minutes(end)))
+
+    now = timezone.localtime()
+    slots = []
+    for offset in range(SUGGESTION_DAYS):
+        day = date + timedelta(days=offset)
+        opens = _minutes(DAY_START)
+        if day < now.date():
+            continue
+        if day == now.date():
+            opens = max(opens, _minutes(now) + 1)
+        candidates = []
+        for gap_start, gap_end in _free_gaps(busy[day], opens, _minutes(DAY_END)):
+            if gap_end - gap_start >= duration:
+                # The start closest to the requested one that still fits.
+                candidates.append(min(max(wanted, gap_start), gap_end - duration))
+        candidates.sort(key=lambda start: abs(start - wanted))
+        slots.extend(Slot(day, _time(start), _time(start + duration)) for start in candidates)
+        if len(slots) >= count:
+            break
+    return slots[:count]
+
+
+def conflict_message(venue, date, conflicts, slots):
+    """A sentence naming the conflicting events and the suggested slots."""
+    booked = ', '.join(
+        f'"{event.title}" ({event.start_time:%H:%M}-{event.end_time:%H:%M}'
+        f'{"" if event.approved else ", pending approval"})'
+        for event in conflicts
+    )
+    message = f'{venue} is already booked on {date:%Y-%m-%d} by {booked}.'
+    if slots:
+        message += ' Free slots: ' + ', '.join(
+            f'{slot.date:%Y-%m-%d} {slot.start_time:%H:%M}-{slot.end_time:%H:%M}' for slot in slots
+        ) + '.'
+    return message
+
+
+class Schedule:
+    """Approved events by venue and day, for checking a batch of events at once.
+
+    One query loads the days involved; each check then walks the intervals
+    of a venue and day, sorted by start, up to its end time. Accepted events
+    are added so that the batch is checked against itself too.
+    """
+
+    def __init__(self, rows=()):
+        self.days = defaultdict(list)
+        for venue_key, date, start_time, end_time in rows:
+            self.add(venue_key, date, start_time, end_time)
+
+    @classmethod
+    def approved_between(cls, first_date, last_date):
+        return cls(
+            Event.objects.filter(approved=True, date__range=(first_date, last_date))
+            .annotate(venue_key=Lower('venue')).values_list('venue_key', 'date', 'start_time', 'end_time')
+        )
+
+    def conflicts(self, venue_key, date, start_time, end_time):
+        # Only intervals starting before our end can overlap; of those, any
+        # that ends after our start does.
+        for start, end in self.days.get((venue_key, date), ()):
+            if start >= end_time:
+                return False
+            if end > start_time:
+                return True
+        return False
+
+    def add(self, venue_key, date, start_time, end_time):
+        insort(self.days[(venue_key, date)], (start_time, end_time))
+
+
+def pending_rows(queryset):
+    """(pk, venue_key, date, start_time, end_time) of events, in approval order."""
+    return list(
+        queryset.annotate(venue_key=Lower('venue'))
+        .order_by('date', 'start_time', 'pk')
+        .values_list('pk', 'venue_key', 'date', 'start_time', 'end_time')
+    )
@@ -0,0 +1,169 @@
+"""Full-text event search on an SQLite FTS5 index.
+
+``events_event_search`` holds the title, description, guest, venue and club
+name of every event, keyed by the event id (its rowid). Triggers on the event
+and club tables keep it current, so bulk_create(), queryset updates and raw
+SQL are covered as well as save(). They are dropped while migrations run and
+reinstalled after (see EventsConfig.ready()); run ``manage.py
+rebuild_search_index`` after a data migration that changes events. Matches
+are ranked with bm25, weighted towards the title and club name.
+
+Like events.backends.sqlite3 this is SQLite only; on other databases the
+index is not created and searches return nothing.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from .models import Event
+
+SEARCH_TABLE = 'events_event_search'
+SEARCH_COLUMNS = ('title', 'description', 'guest', 'venue', 'club')
+# bm25 weights, in SEARCH_COLUMNS order.
+SEARCH_WEIGHTS = (10.0, 1.0, 3.0, 2.0, 5.0)
+# Type-ahead needs at least this many characters before it searches.
+MIN_QUERY_LENGTH = 2
+# Shorter prefixes are not looked for in descriptions.
+SHORT_PREFIX_LENGTH = 4
+
+_COLUMNS = ', '.join(SEARCH_COLUMNS)
+_ROW_FROM_NEW = (
+    'SELECT new.id, new.title, new.description, new.guest, new.venue, name '
+    'FROM events_club WHERE id = new.club_id'
+)
+
+SEARCH_INDEX_SCHEMA = (
+    # Prefix indexes make 2 and 3 character type-ahead prefixes as cheap as
+    # whole words.
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"{_COLUMNS}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+SEARCH_TRIGGERS = {
+    f'{SEARCH_TABLE}_insert': (
+        f"CREATE TRIGGER {SEARCH_TABLE}_insert AFTER INSERT ON events_event BEGIN "
+        f"INSERT INTO {SEARCH_TABLE} (rowid, {_COLUMNS}) {_ROW_FROM_NEW}; END"
+    ),
+    # Event.save() rewrites every column, so only reindex on a real change.
+    f'{SEARCH_TABLE}_update': (
+        f"CREATE TRIGGER {SEARCH_TABLE}_update AFTER UPDATE OF title, description, guest, venue, club_id "
+        f"ON events_event WHEN old.title IS NOT new.title OR old.description IS NOT new.description "
+        f"OR old.guest IS NOT new.guest OR old.venue IS NOT new.venue OR old.club_id IS NOT new.club_id BEGIN "
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; "
+        f"INSERT INTO {SEARCH_TABLE} (rowid, {_COLUMNS}) {_ROW_FROM_NEW}; END"
+    ),
+    f'{SEARCH_TABLE}_delete': (
+        f"CREATE TRIGGER {SEARCH_TABLE}_delete AFTER DELETE ON events_event BEGIN "
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; END"
+    ),
+    f'{SEARCH_TABLE}_club_update': (
+        f"CREATE TRIGGER {SEARCH_TABLE}_club_update AFTER UPDATE OF name ON events_club "
+        f"WHEN old.name IS NOT new.name BEGIN "
+        f"UPDATE {SEARCH_TABLE} SET club = new.name "
+        f"WHERE rowid IN (SELECT id FROM events_event WHERE club_id = new.id); END"
+    ),
+}
+
+
+def search_supported(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'sqlite'
+
+
+def drop_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Drop the triggers; connected to pre_migrate.
+
+    SQLite alters a table by rebuilding it, which drops the triggers on it
+    and fails while a trigger on another table refers to it, so migrations
+    run without them.
+    """
+    if not search_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for name in SEARCH_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def install_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """(Re)create the triggers if the index exists; connected to post_migrate."""
+    if not search_supported(using):
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if SEARCH_TABLE not in connection.introspection.table_names(cursor):
+            return
+        for name, statement in SEARCH_TRIGGERS.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(statement)
+
+
+def drop_search_index(using=DEFAULT_DB_ALIAS):
+    if not search_supported(using):
+        return
+    drop_search_triggers(using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def rebuild_search_index(using=DEFAULT_DB_ALIAS):
+    """(Re)create the index and its triggers and fill it from the event table.
+
+    Returns the number of events indexed.
+    """
+    if not search_supported(using):
+        return 0
+    with transaction.atomic(using=using):
+        drop_search_index(using)
+        with connections[using].cursor() as cursor:
+            cursor.execute(SEARCH_INDEX_SCHEMA)
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, {_COLUMNS}) '
+                f'SELECT e.id, e.title, e.description, e.guest, e.venue, c.name '
+                f'FROM events_event e JOIN events_club c ON c.id = e.club_id'
+            )
+            indexed = cursor.rowcount
+            # Merge the b-trees written by the bulk insert into one.
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        install_search_triggers(using)
+    return indexed
+
+
+def match_expression(query):
+    """An FTS5 MATCH expression for free text, or None if there is nothing to search.
+
+    Every word must match, the last one as a prefix so that results follow
+    the user's typing. Words are quoted, so FTS5 operators and column filters
+    in the input are searched for literally rather than interpreted.
+    """
+    words = re.findall(r'\w+', query)
+    if not words or len(' '.join(words)) < MIN_QUERY_LENGTH:
+        return None
+    *complete, prefix = words
+    prefix = f'"{prefix}"*'
+    if len(words[-1]) < SHORT_PREFIX_LENGTH:
+        # A prefix of a letter or two matches most descriptions, and ranking
+        # every match is what costs; look for it in the short columns only.
+        prefix = '{%s} : %s' % (' '.join(column for column in SEARCH_COLUMNS if column != 'description'), prefix)
+    return ' '.join([*(f'"{word}"' for word in complete), prefix])
+
+
+def search_events(query, limit=10, approved_only=True):
+    """The best matching events for ``query``, best first, as dicts.
+
+    Each dict has the event's id, title, date, start_time (ISO strings, as
+    stored), venue and club name; enough for a type-ahead list without
+    loading the events.
+    """
+    expression = match_expression(query)
+    using = router.db_for_read(Event)
+    if expression is None or not search_supported(using):
+        return []
+    weights = ', '.join(map(str, SEARCH_WEIGHTS))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT e.id, e.title, e.date, e.start_time, e.venue, {SEARCH_TABLE}.club '
+            f'FROM {SEARCH_TABLE} JOIN events_event e ON e.id = {SEARCH_TABLE}.rowid '
+            f'WHERE {SEARCH_TABLE} MATCH %s {"AND e.approved " if approved_only else ""}'
+            f'ORDER BY bm25({SEARCH_TABLE}, {weights}), e.date DESC LIMIT %s',
+            [expression, limit],
+        )
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import HOMEPAGE_FRAGMENTS, bump_fragment_versions
+from .feeds import has_feed_triggers, record_tombstone, touch_club_events
+from .images import schedule_renditions
+from .models import Club, Event, Feedback
+from .ratings import record_feedback
+from .storage import release
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_fragments(sender, **kwargs):
+    bump_fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+
+
+@receiver(post_save, sender=Event)
+def queue_image_renditions(sender, instance, **kwargs):
+    name = instance.image.name if instance.image else None
+    if not name or instance.image_renditions.get('name') == name:
+        return
+    # Re-render the cached carousels once the srcset can point at the renditions.
+    transaction.on_commit(lambda: schedule_renditions(
+        name, on_done=lambda: bump_fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+    ))
+
+
+@receiver(post_delete, sender=Event)
+def release_event_image(sender, instance, **kwargs):
+    # Images are shared by content; only the last reference frees the file.
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: release(name))
+
+
+@receiver([post_save, post_delete], sender=Club)
+def invalidate_club_fragments(sender, **kwargs):
+    bump_fragment_versions(*HOMEPAGE_FRAGMENTS['Club'])
+
+
+# Feed change tracking on databases without the feed triggers (events/feeds.py).
+@receiver(post_delete, sender=Event)
+def record_event_tombstone(sender, instance, using, **kwargs):
+    record_tombstone(instance, using)
+
+
+@receiver(pre_save, sender=Club)
+def remember_club_feed_fields(sender, instance, using, **kwargs):
+    if instance.pk is None or has_feed_triggers(using):
+        return
+    instance._feed_fields = Club.objects.using(using).filter(pk=instance.pk).values_list(
+        'name', 'contact_email').first()
+
+
+@receiver(post_save, sender=Club)
+def touch_renamed_club_events(sender, instance, created, using, **kwargs):
+    before = instance.__dict__.pop('_feed_fields', None)
+    if not created and before is not None and before != (instance.name, instance.contact_email):
+        touch_club_events(instance, using)
+
+
+@receiver(post_save, sender=Feedback)
+def count_new_feedback(sender, instance, created, **kwargs):
+    if created:
+        record_feedback(instance.event_id, instance.rating)
+
+
+@receiver(post_delete, sender=Feedback)
+def uncount_deleted_feedback(sender, instance, origin=None, **kwargs):
+    # Feedback cascading from a deleted event (or club) goes with its counters.
+    if isinstance(origin, Feedback) or getattr(origin, 'model', None) is Feedback:
+        record_feedback(instance.event_id, instance.rating, sign=-1)
@@ -0,0 +1,146 @@
+"""Content-addressed file storage for event images.
+
+Files are named after the SHA-256 of their bytes, so re-uploading a poster
+(every edit_event does) reuses the file that is already on disk instead of
+writing ``poster_nTTnlUe.jpg`` next to it. A file's references are the Event
+rows pointing at it; ``release`` deletes it once there are none left.
+
+An upload of bytes already on disk reuses the file before its Event row is
+saved, so a file is never deleted within UPLOAD_GRACE seconds of being saved
+or reused, and the check and the delete happen under the same lock that
+saving takes. Files past the grace period with no references left are
+collected by ``manage.py dedupe_media``.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.files import File, locks
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+# Extensions by Pillow format, so identical bytes get one name whatever the
+# uploaded file was called.
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+# Longer than any request takes between saving a file and committing the
+# Event row that refers to it.
+UPLOAD_GRACE = 600
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def content_extension(content, name):
+    try:
+        image_format = Image.open(content).format
+    except OSError:
+        image_format = None
+    finally:
+        content.seek(0)
+    return FORMAT_EXTENSIONS.get(image_format, os.path.splitext(name)[1].lower())
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, content):
+        """event_images/poster.png -> event_images/3f/3fa9...c1.png"""
+        digest = content_hash(content)
+        directory = posixpath.dirname(name)
+        if posixpath.basename(directory) == digest[:2]:
+            # Already content-addressed; keep it where it is.
+            directory = posixpath.dirname(directory)
+        return posixpath.join(directory, digest[:2], digest + content_extension(content, name))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(self.hashed_name(name, content), content, max_length)
+
+    def save_derived(self, name, content):
+        """Save a file made from a stored image, such as a rendition, under
+        ``name`` itself rather than a hash of its bytes."""
+        return super().save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        # The name is the content: an existing file with it is the same file.
+        return name
+
+    @contextmanager
+    def lock(self):
+        """An exclusive lock on the stored files, across processes."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, '.lock'), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def recently_saved(self, name):
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) < UPLOAD_GRACE
+        except FileNotFoundError:
+            return False
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        with self.lock():
+            if os.path.exists(full_path):
+                # Reused: restart its grace period so that release() keeps it.
+                os.utime(full_path)
+                return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            with self.lock():
+                # Atomic; a concurrent upload of the same bytes just wins the race.
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def reference_count(name):
+    from .models import Event
+    return Event.objects.filter(image=name).count()
+
+
+def release(name, storage=content_addressed_storage):
+    """Delete a stored image and its renditions if no event references it and
+    it was not saved or reused within UPLOAD_GRACE seconds."""
+    from .images import RENDITION_FORMATS, RENDITION_WIDTHS, rendition_name
+
+    if not name:
+        return False
+    with storage.lock():
+        if storage.recently_saved(name) or reference_count(name):
+            return False
+        storage.delete(name)
+        for width in RENDITION_WIDTHS:
+            for ext in RENDITION_FORMATS:
+                storage.delete(rendition_name(name, width, ext))
+    return True
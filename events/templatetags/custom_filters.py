@@ -1,7 +1,33 @@
 from django import template
+from django.utils.html import format_html, format_html_join
+
+from events.images import available_renditions
 
 register = template.Library()
 
 @register.filter
 def range_filter(value):
     return range(int(value))
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', **attrs):
+    """<picture> offering the WebP/JPEG renditions of an ImageField value.
+
+    Falls back to the original file until the renditions have been generated.
+    Extra keyword arguments become attributes of the <img>.
+    """
+    attributes = format_html_join('', ' {}="{}"', attrs.items())
+    webp = available_renditions(image, 'webp')
+    jpeg = available_renditions(image, 'jpg')
+    if not webp and not jpeg:
+        return format_html('<img src="{}"{}>', image.url, attributes)
+
+    def srcset(renditions):
+        return ', '.join(f'{url} {width}w' for url, width in renditions)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        srcset(webp), sizes, image.url, srcset(jpeg), sizes, attributes,
+    )
@@ -1,3 +1,891 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime, time, timedelta
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .bench.queries import record_queries
+from .bench.routes import clients, routes
+from .bench.seed import seed_clubs, seed_dataset, seed_events
+from .bookings import cancel_booking, reserve_seat
+from .cache import HOMEPAGE_FRAGMENTS, fragment_versions
+from .exports import FEEDBACK_COLUMNS, _column_letter, stream_xlsx
+from .feeds import drop_feed_triggers
+from .homepage import PREVIOUS_ORDERING, past_events, upcoming_events
+from .inbox import ARCHIVED, INBOX, INBOX_ORDERING, INBOX_PAGE_SIZE, UNREAD, folder_messages
+from .models import Booking, ContactMessage, Event, Feedback, User
+from .ratings import rebuild_rating_aggregates
+from .scheduling import Schedule, at_venue, conflicting_events
+from .throttling import LocalCounters, check, client_address, get_counters, throttle
+from .views import DASHBOARD_ORDERING, DASHBOARD_PAGE_SIZE, FEEDBACK_ORDERING, FEEDBACK_PAGE_SIZE
+from .writebehind import WriteBehindQueue
+
+# A SCAN that is not driven by an index reads the whole table.
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)')
+
+
+class HomepageQueryCountTests(TestCase):
+    """The homepage and the event archive run a fixed number of queries."""
+
+    paths = ('index', 'event_archive')
+
+    def setUp(self):
+        self.clubs = seed_clubs(3)
+
+    def get(self, name):
+        # Every fragment cold, so that all the lists are queried.
+        cache.clear()
+        response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_is_independent_of_event_count(self):
+        seed_events(10, self.clubs, approved_ratio=1)
+        expected = {}
+        for name in self.paths:
+            with CaptureQueriesContext(connection) as queries:
+                self.get(name)
+            expected[name] = len(queries)
+
+        seed_events(10_000 - 10, self.clubs, seed=1, approved_ratio=1)
+        for name in self.paths:
+            with self.subTest(name), self.assertNumQueries(expected[name]):
+                self.get(name)
+
+    def test_contact_post_runs_only_the_insert(self):
+        seed_events(10, self.clubs, approved_ratio=1)
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('index'), {
+                'name': 'Visitor', 'email': 'visitor@example.com', 'message': 'Hello',
+            })
+        self.assertRedirects(response, reverse('index'), fetch_redirect_response=False)
+        self.assertTrue(ContactMessage.objects.filter(name='Visitor').exists())
+
+
+class QueryCountGrowthTests(TestCase):
+    """No events view runs more queries because there are more rows (an N+1)."""
+
+    small, large = 10, 500
+    # One extra query per this many extra rows is batching, not an N+1;
+    # Django deletes related rows 100 at a time.
+    chunk_size = 100
+    # Growing queries to show per failing view.
+    traces = 3
+
+    def measure(self, size):
+        """Seed ``size`` rows of everything and record the queries of every route."""
+        results = {}
+        with transaction.atomic():
+            data = seed_dataset(clubs=size, events=size, feedback=size, messages=size, bookings=size,
+                                club_events=size, seed=size, prefix=f'n{size}')
+            users = clients(data)
+            for route in routes(data):
+                # Each request runs in its own savepoint, so routes that delete
+                # or approve leave the data set as seeded for the next one.
+                with transaction.atomic():
+                    cache.clear()
+                    with record_queries() as log:
+                        response = route.request(users[route.user])
+                    transaction.set_rollback(True)
+                results[route.name] = (response.status_code, log)
+            transaction.set_rollback(True)
+        return results
+
+    def growth(self, small_log, large_log):
+        """The queries that grew most, with where they were run from."""
+        small_shapes = small_log.shapes()
+        growing = sorted(
+            ((count - small_shapes.get(shape, 0), shape) for shape, count in large_log.shapes().items()
+             if count > small_shapes.get(shape, 0)),
+            reverse=True,
+        )
+        lines = []
+        for extra, shape in growing[:self.traces]:
+            sql, stack = large_log.example(shape)
+            lines.append(f'+{extra} x {sql[:300]}')
+            for frame in stack:
+                lines.append(f'    {frame.filename}:{frame.lineno} in {frame.name}')
+                if frame.line:
+                    lines.append(f'        {frame.line}')
+        return '\n'.join(lines)
+
+    def test_query_count_is_independent_of_row_count(self):
+        small = self.measure(self.small)
+        large = self.measure(self.large)
+        allowance = (self.large - self.small) // self.chunk_size
+        for name, (status, log) in sorted(small.items()):
+            large_status, large_log = large[name]
+            with self.subTest(name):
+                self.assertLessEqual(
+                    len(large_log) - len(log), allowance,
+                    f'{len(log)} -> {len(large_log)} queries ({status}/{large_status}):\n'
+                    f'{self.growth(log, large_log)}',
+                )
+
+
+def hot_queries():
+    """The filters the views run on every hit, keyed by where they come from."""
+    now = timezone.make_aware(datetime.now())
+    club_past_events = Event.objects.filter(club=1, date__lt=now).order_by('-date')
+    return {
+        'index: upcoming events': upcoming_events(now),
+        'index: previous events': past_events(now.date()).order_by(*PREVIOUS_ORDERING),
+        'admin_dashboard: all events': Event.objects.order_by(*DASHBOARD_ORDERING)[:DASHBOARD_PAGE_SIZE + 1],
+        'admin_dashboard: approved events': Event.objects.filter(approved=True).order_by(
+            *DASHBOARD_ORDERING)[:DASHBOARD_PAGE_SIZE + 1],
+        'admin_event_manage: pending events': Event.objects.filter(approved=False).order_by('-date'),
+        'club_dashboard/manage_event: club events': Event.objects.filter(club=1).order_by('-date'),
+        'club_view_feedbacks: past events': club_past_events.filter(feedback_count__gt=0),
+        'EventForm/approve_event: venue conflicts': at_venue('Seminar Hall').filter(
+            date=now.date(), start_time__lt='12:00', end_time__gt='10:00'),
+        'events_json: changes since a sync token': Event.objects.filter(updated_at__gte=now),
+        'feedbacks_view/feedback_page: feedback page': Feedback.objects.filter(event=1).order_by(
+            *FEEDBACK_ORDERING)[:FEEDBACK_PAGE_SIZE + 1],
+        'view_contact_messages: inbox': folder_messages(INBOX).order_by(*INBOX_ORDERING)[:INBOX_PAGE_SIZE + 1],
+        'view_contact_messages: unread': folder_messages(UNREAD).order_by(*INBOX_ORDERING)[:INBOX_PAGE_SIZE + 1],
+        'view_contact_messages: archived': folder_messages(ARCHIVED).order_by(*INBOX_ORDERING)[:INBOX_PAGE_SIZE + 1],
+        'view_contact_messages: unread count': ContactMessage.objects.filter(is_read=False, is_archived=False),
+        'purge_contact_messages: retention batch': ContactMessage.objects.filter(
+            submitted_at__lt=now).order_by('submitted_at', 'id')[:500],
+    }
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN checks only run on SQLite.')
+class QueryPlanTests(TestCase):
+    """No hot query falls back to a full table scan."""
+
+    def test_hot_queries_use_indexes(self):
+        for label, queryset in hot_queries().items():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertFalse(FULL_SCAN.findall(plan), f'Full table scan in {label}:\n{plan}')
+
+
+class PerformanceStatsTests(TestCase):
+    """The stats and their reset are for superusers; club accounts are staff too."""
+
+    def setUp(self):
+        self.club = seed_clubs(1)[0]
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', None)
+
+    def test_club_is_redirected_to_login(self):
+        self.client.force_login(self.club.user)
+        response = self.client.get(reverse('performance_stats'))
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse('performance_stats'), {'reset': '1'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_superuser_gets_the_stats(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('performance_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', response.json())
+
+
+class FeedSyncTests(TestCase):
+    """A client syncing with a token hears about changed, un-approved and deleted events."""
+
+    def setUp(self):
+        self.club = seed_clubs(1)[0]
+        self.kept, self.other = seed_events(2, [self.club], approved_ratio=1)
+
+    def sync(self, token=None):
+        response = self.client.get(reverse('events_json'), {'sync_token': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_full_feed_without_a_token(self):
+        feed = self.sync()
+        self.assertTrue(feed['full'])
+        self.assertEqual({event['id'] for event in feed['events']}, {self.kept.pk, self.other.pk})
+
+    def test_delete_shows_up_in_the_next_delta(self):
+        token = self.sync()['sync_token']
+        deleted = self.other.pk
+        self.other.delete()
+        feed = self.sync(token)
+        self.assertFalse(feed['full'])
+        self.assertEqual(feed['removed'], [deleted])
+
+    def test_unapproval_shows_up_in_the_next_delta(self):
+        token = self.sync()['sync_token']
+        self.other.approved = False
+        self.other.save()
+        feed = self.sync(token)
+        self.assertEqual(feed['removed'], [self.other.pk])
+        self.assertNotIn(self.other.pk, [event['id'] for event in feed['events']])
+
+    def test_club_rename_resends_its_events(self):
+        Event.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        token = self.sync()['sync_token']
+        self.assertEqual(self.sync(token)['events'], [])
+        self.club.name = 'Renamed'
+        self.club.save()
+        feed = self.sync(token)
+        self.assertEqual({event['club']['name'] for event in feed['events']}, {'Renamed'})
+        self.assertEqual(len(feed['events']), 2)
+
+
+class FeedSyncWithoutTriggersTests(FeedSyncTests):
+    """The same, through the signal handlers used on databases other than SQLite."""
+
+    def setUp(self):
+        super().setUp()
+        drop_feed_triggers()
+        patcher = mock.patch('events.feeds.has_feed_triggers', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        signals_patcher = mock.patch('events.signals.has_feed_triggers', return_value=False)
+        signals_patcher.start()
+        self.addCleanup(signals_patcher.stop)
+
+
+class BookingTests(TestCase):
+    """Seats are never oversold, and a freed seat goes to the waitlist first."""
+
+    def setUp(self):
+        self.event = seed_events(1, seed_clubs(1), approved_ratio=1)[0]
+        Event.objects.filter(pk=self.event.pk).update(total_seats=2)
+
+    def book(self, count):
+        return [reserve_seat(self.event, f'Guest {n}', f'guest{n}@example.com') for n in range(count)]
+
+    def seats_booked(self):
+        return Event.objects.values_list('seats_booked', flat=True).get(pk=self.event.pk)
+
+    def test_seats_are_capped(self):
+        bookings = self.book(4)
+        self.assertEqual([booking.status for booking in bookings],
+                         [Booking.CONFIRMED, Booking.CONFIRMED, Booking.WAITLISTED, Booking.WAITLISTED])
+        self.assertEqual(self.seats_booked(), 2)
+
+    def test_cancel_promotes_the_oldest_waitlisted(self):
+        first, _, waitlisted, _ = self.book(4)
+        promoted = cancel_booking(first)
+        self.assertEqual(promoted.pk, waitlisted.pk)
+        waitlisted.refresh_from_db()
+        self.assertEqual(waitlisted.status, Booking.CONFIRMED)
+        self.assertEqual(self.seats_booked(), 2)
+
+    def test_cancel_without_a_waitlist_frees_the_seat(self):
+        first, _ = self.book(2)
+        self.assertIsNone(cancel_booking(first))
+        self.assertIsNone(cancel_booking(first))  # already cancelled
+        self.assertEqual(self.seats_booked(), 1)
+
+    def test_deleting_a_confirmed_booking_frees_its_seat(self):
+        first, second = self.book(2)
+        first.delete()
+        self.assertEqual(self.seats_booked(), 1)
+        Booking.objects.filter(pk=second.pk).delete()
+        self.assertEqual(self.seats_booked(), 0)
+        self.assertEqual(self.book(1)[0].status, Booking.CONFIRMED)
+
+    def test_deleting_a_confirmed_booking_promotes_the_waitlist(self):
+        first, _, waitlisted = self.book(3)
+        first.delete()
+        waitlisted.refresh_from_db()
+        self.assertEqual(waitlisted.status, Booking.CONFIRMED)
+        self.assertEqual(self.seats_booked(), 2)
+
+    def test_deleting_a_waitlisted_booking_keeps_the_count(self):
+        *_, waitlisted = self.book(3)
+        waitlisted.delete()
+        self.assertEqual(self.seats_booked(), 2)
+
+
+class RatingAggregateTests(TestCase):
+    """The rebuild corrects drifted aggregates and bumps only those events."""
+
+    def setUp(self):
+        self.drifted, self.correct = seed_events(2, seed_clubs(1), approved_ratio=1)
+        for event in (self.drifted, self.correct):
+            Feedback.objects.create(event=event, comment='Good', rating=4)
+        self.long_ago = timezone.now() - timedelta(days=30)
+        Event.objects.update(updated_at=self.long_ago)
+        Event.objects.filter(pk=self.drifted.pk).update(feedback_count=7, rating_1_count=3)
+
+    def test_rebuild_corrects_only_drifted_events(self):
+        self.assertEqual(rebuild_rating_aggregates(), 1)
+        drifted = Event.objects.get(pk=self.drifted.pk)
+        self.assertEqual((drifted.feedback_count, drifted.rating_sum, drifted.rating_1_count, drifted.rating_4_count),
+                         (1, 4, 0, 1))
+        self.assertGreater(drifted.updated_at, self.long_ago)
+        self.assertEqual(Event.objects.get(pk=self.correct.pk).updated_at, self.long_ago)
+
+    def test_rebuild_of_correct_aggregates_writes_nothing(self):
+        rebuild_rating_aggregates()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rebuild_rating_aggregates(), 0)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+
+class WriteBehindTests(TestCase):
+    """Queued rows are written, retried or dead-lettered, never silently lost."""
+
+    def setUp(self):
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir)
+        self.queue = WriteBehindQueue(spool_dir, max_attempts=2)
+        # Flushed by the tests themselves rather than by the background thread.
+        patcher = mock.patch.object(self.queue, 'start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, *names):
+        for name in names:
+            self.queue.submit(ContactMessage(name=name, email='guest@example.com', message='Hello'))
+
+    def spool_files(self):
+        return list(self.queue.spool_dir.glob('*.jsonl'))
+
+    def test_flush_writes_the_queue_in_one_batch(self):
+        self.submit('Ada', 'Grace', 'Edsger')
+        self.assertEqual(len(self.spool_files()), 1)
+        with self.assertNumQueries(3):  # savepoint, INSERT, release
+            self.assertEqual(self.queue.flush(), 3)
+        self.assertEqual(sorted(ContactMessage.objects.values_list('name', flat=True)), ['Ada', 'Edsger', 'Grace'])
+        self.assertEqual(self.spool_files(), [])
+        self.assertEqual(self.queue.stats()['queue_depth'], 0)
+
+    def test_a_bad_row_is_dead_lettered_and_the_others_written(self):
+        self.submit('Ada', None, 'Grace')  # name is NOT NULL
+        with self.assertLogs('events.writebehind', 'ERROR') as logs:
+            self.assertEqual(self.queue.flush(), 2)
+        self.assertEqual(sorted(ContactMessage.objects.values_list('name', flat=True)), ['Ada', 'Grace'])
+        self.assertEqual(self.queue.stats()['dead_lettered'], 1)
+        self.assertIn('Dropping a queued row', logs.output[-1])
+        self.assertEqual(self.spool_files(), [])
+
+    def test_failing_rows_are_retried_up_to_max_attempts(self):
+        self.submit('Ada')
+        with mock.patch('events.writebehind.write_batch', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('events.writebehind', 'WARNING'):
+            self.assertEqual(self.queue.flush(), 0)
+            self.assertEqual(self.queue.stats()['queue_depth'], 1)
+            self.assertEqual(len(self.spool_files()), 1)
+            self.assertEqual(self.queue.flush(), 0)
+        self.assertEqual(self.queue.stats()['queue_depth'], 0)
+        self.assertEqual(self.queue.stats()['dead_lettered'], 1)
+        self.assertEqual(self.spool_files(), [])
+
+    def test_a_retried_row_is_written_once_the_database_recovers(self):
+        self.submit('Ada')
+        with mock.patch('events.writebehind.write_batch', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('events.writebehind', 'WARNING'):
+            self.queue.flush()
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertTrue(ContactMessage.objects.filter(name='Ada').exists())
+        self.assertEqual(self.spool_files(), [])
+
+    def test_an_unexpected_error_keeps_the_rows_for_the_next_flush(self):
+        self.submit('Ada', 'Grace')
+        with mock.patch('events.writebehind.write_batch', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.queue.flush()
+        self.assertEqual(self.queue.stats()['queue_depth'], 2)
+        self.assertEqual(self.queue.flush(), 2)
+        self.assertEqual(ContactMessage.objects.count(), 2)
+
+
+class ThrottleTests(TestCase):
+    """Sliding-window limits on the form posts, and their Retry-After."""
+
+    rates = {'ip': '5/m'}
+    start = 6000.0  # the start of a one-minute window
+
+    def setUp(self):
+        self.counters = LocalCounters()
+
+    def attempts(self, count, at, address='192.0.2.1'):
+        return [check(self.counters, 'contact', address, self.rates, now=at) for _ in range(count)]
+
+    def test_limit_per_address(self):
+        *allowed, limited = self.attempts(6, self.start)
+        self.assertEqual(allowed, [None] * 5)
+        self.assertEqual(limited[0], 'ip')
+        self.assertEqual(self.attempts(1, self.start, address='192.0.2.2'), [None])
+
+    def test_previous_window_counts_for_what_still_overlaps(self):
+        self.attempts(6, self.start)
+        # Half of the previous window's 6 attempts still count: 3 + 2 fit, 3 + 3 do not.
+        *allowed, limited = self.attempts(3, self.start + 90)
+        self.assertEqual(allowed, [None, None])
+        self.assertEqual(limited[0], 'ip')
+
+    def test_retry_after_a_full_current_window(self):
+        *_, limited = self.attempts(6, self.start + 30)
+        # The 6th attempt counts too: 6 * (1 - 4/6) of the next window must pass.
+        self.assertEqual(limited, ('ip', 30 + 20))
+
+    def test_retry_after_a_full_previous_window(self):
+        self.attempts(10, self.start - 60)
+        # 10 * (1 - t/60) + 2 <= 5 from t = 42 on.
+        self.assertEqual(self.attempts(1, self.start + 30), [('ip', 12)])
+
+    def test_endpoint_limit_covers_every_address(self):
+        rates = {'ip': '5/m', 'endpoint': '3/m'}
+        results = [check(self.counters, 'contact', f'192.0.2.{n}', rates, now=self.start) for n in range(4)]
+        self.assertEqual(results[:3], [None] * 3)
+        self.assertEqual(results[3][0], 'endpoint')
+
+    def test_ipv6_clients_are_grouped_by_64(self):
+        factory = RequestFactory()
+        addresses = {client_address(factory.post('/', REMOTE_ADDR=address))
+                     for address in ('2001:db8:0:1::1', '2001:db8:0:1:ffff::2')}
+        self.assertEqual(addresses, {'2001:db8:0:1::'})
+        self.assertEqual(client_address(factory.post('/', REMOTE_ADDR='2001:db8:0:2::1')), '2001:db8:0:2::')
+
+    def test_forwarded_address_is_taken_from_the_trusted_proxies(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.9, 203.0.113.7')
+        self.assertEqual(client_address(request), '10.0.0.1')
+        with self.settings(THROTTLE_PROXY_COUNT=1):
+            self.assertEqual(client_address(request), '203.0.113.7')
+        with self.settings(THROTTLE_PROXY_COUNT=2):
+            self.assertEqual(client_address(request), '198.51.100.9')
+        with self.settings(THROTTLE_PROXY_COUNT=3):
+            self.assertEqual(client_address(request), '10.0.0.1')  # fewer entries than proxies
+
+    @override_settings(THROTTLE_RATES={'contact': {'ip': '1/m'}})
+    def test_failing_backend_lets_requests_through(self):
+        view = throttle('contact')(lambda request: HttpResponse('ok'))
+        request = RequestFactory().post('/')
+        with mock.patch('events.throttling.check', side_effect=ConnectionError), \
+                self.assertLogs('events.throttling', 'WARNING'):
+            self.assertEqual([view(request).status_code for _ in range(3)], [200] * 3)
+
+
+@override_settings(THROTTLE_RATES={'contact': {'ip': '2/m'}})
+class ThrottledViewTests(TestCase):
+    def setUp(self):
+        get_counters().clear()
+        self.addCleanup(get_counters().clear)
+
+    def test_contact_posts_past_the_limit_get_429(self):
+        form = {'name': 'Visitor', 'email': 'visitor@example.com', 'message': 'Hello'}
+        statuses = [self.client.post(reverse('index'), form).status_code for _ in range(2)]
+        self.assertEqual(statuses, [302, 302])
+        response = self.client.post(reverse('index'), form)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(ContactMessage.objects.count(), 2)
+        self.assertEqual(self.client.get(reverse('index')).status_code, 200)
+
+
+class SchedulingTests(TestCase):
+    """Overlaps at a venue, however it is capitalized; back-to-back is fine."""
+
+    def setUp(self):
+        self.club = seed_clubs(1)[0]
+        self.date = timezone.localdate() + timedelta(days=10)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def event(self, start, end, approved=True, venue='Seminar Hall'):
+        return Event.objects.create(title=f'{start}-{end}', description='Talk', club=self.club, venue=venue,
+                                    date=self.date, start_time=time(start), end_time=time(end),
+                                    total_seats=10, approved=approved)
+
+    def test_schedule_conflicts(self):
+        schedule = Schedule([('hall', self.date, time(8), time(9)), ('hall', self.date, time(10), time(12))])
+        self.assertFalse(schedule.conflicts('hall', self.date, time(9), time(10)))   # back to back
+        self.assertTrue(schedule.conflicts('hall', self.date, time(11), time(13)))
+        self.assertTrue(schedule.conflicts('hall', self.date, time(9), time(11)))
+        self.assertFalse(schedule.conflicts('hall', self.date, time(12), time(14)))
+        self.assertFalse(schedule.conflicts('other hall', self.date, time(10), time(12)))
+        schedule.add('hall', self.date, time(7), time(15))  # longer than those after it
+        self.assertTrue(schedule.conflicts('hall', self.date, time(13), time(14)))
+
+    def test_venue_is_matched_case_insensitively(self):
+        booked = self.event(10, 12, venue='Seminar Hall')
+        conflicts = conflicting_events('seminar HALL', self.date, time(11), time(13))
+        self.assertEqual([event.pk for event in conflicts], [booked.pk])
+        self.assertEqual(conflicting_events('Seminar Hall', self.date, time(12), time(13)), [])
+
+    def approve(self, event):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('approve_event', args=[event.pk]), follow=True)
+        event.refresh_from_db()
+        return [str(message) for message in response.context['messages']]
+
+    def test_approval_ignores_pending_events(self):
+        self.event(10, 12, approved=False)
+        candidate = self.event(11, 13, approved=False)
+        self.assertEqual(self.approve(candidate), [])
+        self.assertTrue(candidate.approved)
+
+    def test_approval_is_refused_on_an_approved_overlap(self):
+        self.event(10, 12, venue='seminar hall')
+        self.event(12, 14, approved=False)
+        candidate = self.event(11, 13, approved=False)
+        [message] = self.approve(candidate)
+        self.assertFalse(candidate.approved)
+        self.assertIn('"10-12"', message)
+        self.assertNotIn('"12-14"', message)
+        # The pending 12-14 does not hold up the nearest free slot either.
+        self.assertIn(f'{self.date:%Y-%m-%d} 12:00-14:00', message)
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged pages are answered 304, and only to GET and HEAD."""
+
+    def setUp(self):
+        cache.clear()
+        self.club = seed_clubs(1)[0]
+        self.event = seed_events(1, [self.club], approved_ratio=1)[0]
+
+    def validators(self, path):
+        self.client.get(path)  # sets the CSRF cookie, which the ETag covers
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag'], response['Last-Modified']
+
+    def test_matching_validators_get_304(self):
+        for path in (reverse('index'), reverse('feedbacks', args=[self.event.pk])):
+            with self.subTest(path):
+                etag, last_modified = self.validators(path)
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                self.assertEqual(self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_event_change_changes_the_etag(self):
+        path = reverse('feedbacks', args=[self.event.pk])
+        etag, _ = self.validators(path)
+        Feedback.objects.create(event=self.event, comment='Great', rating=5)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_homepage_etag_changes_when_the_next_event_starts(self):
+        day = timezone.localdate() + timedelta(days=10)
+        Event.objects.filter(pk=self.event.pk).update(date=day, start_time=time(12), end_time=time(13))
+        noon = timezone.make_aware(datetime.combine(day, time(12)))
+        etags = []
+        for moment in (noon - timedelta(hours=1), noon - timedelta(minutes=1), noon + timedelta(seconds=1)):
+            with mock.patch('django.utils.timezone.now', return_value=moment):
+                etags.append(self.validators(reverse('index'))[0])
+        self.assertEqual(etags[0], etags[1])
+        self.assertNotEqual(etags[1], etags[2])
+
+    def test_posts_are_never_answered_304(self):
+        etag, last_modified = self.validators(reverse('index'))
+        response = self.client.post(reverse('index'), {'name': 'Visitor', 'email': 'visitor@example.com',
+                                                       'message': 'Hello'},
+                                    HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(ContactMessage.objects.filter(name='Visitor').exists())
+
+        path = reverse('feedbacks', args=[self.event.pk])
+        etag, last_modified = self.validators(path)
+        response = self.client.post(path, {'comment': 'Great', 'rating': 5},
+                                    HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertNotEqual(response.status_code, 304)
+        self.assertEqual(Feedback.objects.filter(event=self.event).count(), 1)
+
+
+class BulkModerationTests(TestCase):
+    """Bulk approval and rejection report an outcome per event."""
+
+    def setUp(self):
+        self.club = seed_clubs(1)[0]
+        self.date = timezone.localdate() + timedelta(days=10)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def event(self, start, end, approved=False):
+        return Event.objects.create(title=f'{start}-{end}', description='Talk', club=self.club, venue='Seminar Hall',
+                                    date=self.date, start_time=time(start), end_time=time(end),
+                                    total_seats=10, approved=approved)
+
+    def moderate(self, action, *events, **data):
+        response = self.client.post(reverse('bulk_moderate_events') + '?format=json',
+                                    {'action': action, 'event_ids': [event.pk for event in events], **data})
+        self.assertEqual(response.status_code, 200)
+        return {int(pk): outcome for pk, outcome in response.json()['results'].items()}
+
+    def test_approve_reports_each_event(self):
+        booked = self.event(8, 10, approved=True)
+        first, overlapping, clashing, free = self.event(10, 12), self.event(11, 13), self.event(9, 11), self.event(14, 15)
+        missing = Event(pk=first.pk + 1000)
+        results = self.moderate('approve', booked, first, overlapping, clashing, free, missing)
+        self.assertEqual(results, {
+            booked.pk: 'not_pending',
+            first.pk: 'approved',
+            overlapping.pk: 'conflicting',  # with first, approved in the same call
+            clashing.pk: 'conflicting',     # with booked
+            free.pk: 'approved',
+            missing.pk: 'not_found',
+        })
+        self.assertEqual(set(Event.objects.filter(approved=True).values_list('pk', flat=True)),
+                         {booked.pk, first.pk, free.pk})
+
+    def test_reject_deletes_only_pending_events(self):
+        approved, pending = self.event(8, 10, approved=True), self.event(10, 12)
+        self.assertEqual(self.moderate('reject', approved, pending),
+                         {approved.pk: 'not_pending', pending.pk: 'rejected'})
+        self.assertEqual(list(Event.objects.values_list('pk', flat=True)), [approved.pk])
+
+    def test_all_pending_scope_and_summary_message(self):
+        for start, approved in ((8, False), (10, False), (8, True)):
+            self.event(start, start + 2, approved)
+        response = self.client.post(reverse('bulk_moderate_events'), {'action': 'reject', 'scope': 'all_pending',
+                                                                      'club': self.club.pk}, follow=True)
+        self.assertRedirects(response, reverse('admin_event_manage'))
+        self.assertEqual([str(message) for message in response.context['messages']], ['2 rejected'])
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_one_call_bumps_the_fragment_versions_once(self):
+        events = [self.event(hour, hour + 1) for hour in range(8, 14)]
+        before = fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+        for action in ('approve', 'reject'):
+            with self.subTest(action), mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+                self.moderate(action, *(events[:3] if action == 'approve' else events[3:]))
+                self.assertEqual(set_many.call_count, 1)
+        after = fragment_versions(*HOMEPAGE_FRAGMENTS['Event'])
+        self.assertTrue(all(after[name] != before[name] for name in before))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post(reverse('bulk_moderate_events'), {'action': 'publish'}).status_code, 400)
+        self.assertEqual(self.client.post(reverse('bulk_moderate_events'),
+                                          {'action': 'approve', 'event_ids': ['x']}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('bulk_moderate_events')).status_code, 405)
+        self.client.force_login(self.club.user)
+        pending = self.event(8, 10)
+        self.client.post(reverse('bulk_moderate_events'), {'action': 'approve', 'event_ids': [pending.pk]})
+        pending.refresh_from_db()
+        self.assertFalse(pending.approved)
+
+
+class ExportTests(TestCase):
+    """The CSV and XLSX exports round-trip awkward text."""
+
+    awkward = 'Loved it, really. "Best" talk <ever> & more\nSecond line'
+
+    def setUp(self):
+        self.event = seed_events(1, seed_clubs(1), approved_ratio=1)[0]
+        Feedback.objects.create(event=self.event, comment=self.awkward, rating=5)
+        Feedback.objects.create(event=self.event, comment='=HYPERLINK("http://example.com")', rating=1)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def download(self, name):
+        response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="'))
+        return b''.join(response.streaming_content)
+
+    def test_csv_escapes_commas_quotes_and_newlines(self):
+        content = self.download('export_feedback_csv').decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        header, *rows = csv.reader(io.StringIO(content[1:]))
+        self.assertEqual(header, [name for name, _ in FEEDBACK_COLUMNS])
+        comments = [row[header.index('comment')] for row in rows]
+        self.assertEqual(comments, [self.awkward, '\'=HYPERLINK("http://example.com")'])
+        self.assertIn('"Loved it, really. ""Best"" talk <ever> & more\nSecond line"', content)
+
+    def sheet(self, content):
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            self.assertNotIn('xl/sharedStrings.xml', workbook.namelist())  # strings are inline
+            return ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+
+    def cells(self, sheet):
+        namespace = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        return {cell.get('r'): cell.findtext('s:v', namespaces=namespace) or
+                cell.findtext('s:is/s:t', namespaces=namespace) for cell in sheet.iterfind('.//s:c', namespace)}
+
+    def test_xlsx_sheet(self):
+        content = self.download('export_feedback_xlsx')
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            self.assertIn(b'&lt;ever&gt; &amp; more', workbook.read('xl/worksheets/sheet1.xml'))
+        cells = self.cells(self.sheet(content))
+        self.assertEqual([cells[f'{column}1'] for column in 'ABCDEFGHI'], [name for name, _ in FEEDBACK_COLUMNS])
+        self.assertEqual(cells['C2'], '5')
+        self.assertEqual(cells['D2'], self.awkward)
+        self.assertEqual(cells['D3'], '=HYPERLINK("http://example.com")')  # text, not a formula
+        self.assertNotIn('A4', cells)
+
+    def test_xlsx_columns_past_z(self):
+        header = [f'column {n}' for n in range(30)]
+        cells = self.cells(self.sheet(b''.join(stream_xlsx(header, [list(range(30))], 'Wide'))))
+        self.assertEqual((cells['Z1'], cells['AA1'], cells['AD1']), ('column 25', 'column 26', 'column 29'))
+        self.assertEqual(cells['AD2'], '29')
+        self.assertEqual([_column_letter(index) for index in (0, 25, 26, 51, 52, 701, 702)],
+                         ['A', 'Z', 'AA', 'AZ', 'BA', 'ZZ', 'AAA'])
+
+
+class InboxTests(TestCase):
+    """Moving messages between folders, and the retention job."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.messages = {
+            days: ContactMessage.objects.create(name=f'{days} days', email='guest@example.com', message='Hello',
+                                                submitted_at=now - timedelta(days=days))
+            for days in (1, 10, 100, 400, 500)
+        }
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def folder(self, folder):
+        response = self.client.get(reverse('view_contact_messages'), {'folder': folder})
+        self.assertEqual(response.status_code, 200)
+        return [message.name for message in response.context['contact_messages']], response.context['unread_count']
+
+    def update(self, action, *days):
+        response = self.client.post(reverse('update_contact_messages'), {
+            'action': action, 'ids': [self.messages[age].pk for age in days], 'folder': UNREAD,
+        })
+        self.assertRedirects(response, reverse('view_contact_messages') + f'?folder={UNREAD}',
+                             fetch_redirect_response=False)
+
+    def test_mark_read_and_unread(self):
+        self.update('read', 1, 10)
+        self.assertEqual(self.folder(UNREAD), (['100 days', '400 days', '500 days'], 3))
+        self.assertEqual(self.folder(INBOX)[0], ['1 days', '10 days', '100 days', '400 days', '500 days'])
+        self.update('unread', 10)
+        self.assertEqual(self.folder(UNREAD), (['10 days', '100 days', '400 days', '500 days'], 4))
+
+    def test_archive_moves_messages_between_folders(self):
+        self.update('archive', 10, 400)
+        self.assertEqual(self.folder(INBOX)[0], ['1 days', '100 days', '500 days'])
+        self.assertEqual(self.folder(ARCHIVED)[0], ['10 days', '400 days'])
+        self.assertEqual(self.folder(UNREAD), (['1 days', '100 days', '500 days'], 3))
+        self.update('unarchive', 400)
+        self.assertEqual(self.folder(ARCHIVED)[0], ['10 days'])
+        self.update('delete', 10)
+        self.assertEqual(self.folder(ARCHIVED)[0], [])
+        self.assertEqual(ContactMessage.objects.count(), 4)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('view_contact_messages'), {'folder': 'spam'}).status_code, 400)
+        self.assertEqual(self.client.post(reverse('update_contact_messages'),
+                                          {'action': 'star', 'ids': [self.messages[1].pk]}).status_code, 400)
+
+    def test_purge_deletes_and_archives_by_age(self):
+        out = io.StringIO()
+        call_command('purge_contact_messages', archive_days=90, delete_days=365, batch_size=1, pause=0, stdout=out)
+        self.assertIn('Archived 1 and deleted 2 contact messages.', out.getvalue())
+        self.assertEqual(dict(ContactMessage.objects.values_list('name', 'is_archived')),
+                         {'1 days': False, '10 days': False, '100 days': True})
+
+
+def walk_pages(fetch):
+    """Every id on the pages of ``fetch(cursor) -> (ids, next cursor)``, following the cursors."""
+    ids, cursor = [], None
+    for _ in range(100):
+        page, cursor = fetch(cursor)
+        ids.extend(page)
+        if not cursor:
+            return ids
+    raise AssertionError('The cursors never ran out.')
+
+
+def bad_cursors(*values):
+    """Cursors that do not decode, do not match the ordering, or hold values of the wrong type."""
+    def encode(items):
+        return base64.urlsafe_b64encode(json.dumps(items).encode()).decode().rstrip('=')
+    return ['not a cursor', encode({'date': values[0]}), encode(list(values[:-1])), encode(['x'] * len(values))]
+
+
+class ArchivePaginationTests(TestCase):
+    """The archive pages cover every past event once, however many share a date and time."""
+
+    def setUp(self):
+        today = timezone.localdate()
+        events = seed_events(30, seed_clubs(1), approved_ratio=1)
+        for index, event in enumerate(events):
+            Event.objects.filter(pk=event.pk).update(date=today - timedelta(days=1 + index // 7), start_time=time(10))
+        self.expected = list(past_events(today).order_by(*PREVIOUS_ORDERING).values_list('pk', flat=True))
+
+    def get(self, cursor, **params):
+        response = self.client.get(reverse('event_archive'), {**params, **({'after': cursor} if cursor else {})})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_html_pages(self):
+        def fetch(cursor):
+            response = self.get(cursor)
+            return [event.pk for batch in response.context['batches'] for event in batch if event], \
+                response.get('X-Next-Cursor')
+        self.assertEqual(walk_pages(fetch), self.expected)
+
+    def test_json_pages(self):
+        def fetch(cursor):
+            data = self.get(cursor, format='json').json()
+            return [event['id'] for event in data['events']], data['next']
+        self.assertEqual(walk_pages(fetch), self.expected)
+
+    def test_bad_cursor_is_rejected(self):
+        for cursor in bad_cursors('2024-01-01', '10:00:00', '1'):
+            with self.subTest(cursor):
+                self.assertEqual(self.client.get(reverse('event_archive'), {'after': cursor}).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    """The feedback and dashboard pages cover every row once, sort-key ties included."""
+
+    def setUp(self):
+        self.event = seed_events(1, seed_clubs(1), approved_ratio=1)[0]
+        now = timezone.now()
+        Feedback.objects.bulk_create([
+            Feedback(event=self.event, comment=f'Comment {n}', rating=1 + n % 5,
+                     submitted_at=now - timedelta(minutes=n // 7))
+            for n in range(2 * FEEDBACK_PAGE_SIZE + 5)
+        ])
+        self.expected = list(Feedback.objects.order_by(*FEEDBACK_ORDERING).values_list('pk', flat=True))
+
+    def get(self, name, cursor):
+        response = self.client.get(reverse(name, args=[self.event.pk]), {'after': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_feedbacks_view_pages(self):
+        def fetch(cursor):
+            page = self.get('feedbacks', cursor).context['feedbacks']
+            return [feedback.pk for feedback in page], page.next_cursor
+        self.assertEqual(walk_pages(fetch), self.expected)
+
+    def test_feedback_page_pages(self):
+        def fetch(cursor):
+            response = self.get('feedback_page', cursor)
+            return [feedback.pk for feedback in response.context['feedbacks']], response.get('X-Next-Cursor')
+        self.assertEqual(walk_pages(fetch), self.expected)
+
+    def test_admin_dashboard_pages(self):
+        events = seed_events(2 * DASHBOARD_PAGE_SIZE + 5, seed_clubs(1, prefix='other'), seed=1)
+        for index, event in enumerate(events):
+            Event.objects.filter(pk=event.pk).update(date=self.event.date - timedelta(days=index // 9),
+                                                     start_time=time(10))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        def fetch(cursor):
+            response = self.client.get(reverse('admin_dashboard'), {'after': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            page = response.context['events']
+            return [event.pk for event in page], page.next_cursor
+        expected = list(Event.objects.order_by(*DASHBOARD_ORDERING).values_list('pk', flat=True))
+        self.assertEqual(walk_pages(fetch), expected)
+
+    def test_bad_cursor_is_rejected(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        feedback_values = ('2024-01-01T10:00:00+00:00', '1')
+        urls = {
+            reverse('feedbacks', args=[self.event.pk]): feedback_values,
+            reverse('feedback_page', args=[self.event.pk]): feedback_values,
+            reverse('admin_dashboard'): ('2024-01-01', '10:00:00', '1'),
+        }
+        for url, values in urls.items():
+            for cursor in bad_cursors(*values):
+                with self.subTest(url=url, cursor=cursor):
+                    self.assertEqual(self.client.get(url, {'after': cursor}).status_code, 400)
@@ -0,0 +1,266 @@
+"""Throttling of the public form posts: contact, feedback, club registration
+and bookings.
+
+Each scope in THROTTLE_RATES has up to two sliding-window limits, written
+like ``'5/10m'``: ``ip`` per client address and ``endpoint`` for everybody
+together, which keeps a burst from many addresses from queueing on the
+SQLite write lock. The window is a pair of fixed-window counters, the
+previous one weighted by how much of it still overlaps, so all a backend
+needs is an atomic increment:
+
+* LocalCounters (the default) keeps them in this process; limits are per
+  worker.
+* CacheCounters keeps them in the THROTTLE_CACHE cache, shared by every
+  worker. Use a cache with an atomic incr(), such as Redis or Memcached.
+
+The @throttle decorator checks before the view runs, so a rejected post
+costs no queries. Every attempt counts, rejected ones included, so a client
+that keeps posting stays locked out until it slows down.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from functools import lru_cache, wraps
+from ipaddress import ip_address, ip_network
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from .instrumentation import Histogram
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+RULES = ('ip', 'endpoint')
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+US_BUCKETS = (5, 10, 20, 50, 100, 200, 500, 1000, 5000, float('inf'))
+_RATE = re.compile(r'(\d+)/(\d*)([smhd])')
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``'5/10m'`` -> (5, 600): the limit and the window in seconds."""
+    match = _RATE.fullmatch(rate)
+    if match is None:
+        raise ValueError(f'Invalid rate: {rate!r}')
+    limit, count, unit = match.groups()
+    return int(limit), int(count or 1) * UNITS[unit]
+
+
+class LocalCounters:
+    """Counters in a dict of this process. Expired ones are swept every
+    ``sweep_interval`` seconds; past ``max_keys`` the oldest are dropped."""
+
+    blocking = False
+
+    def __init__(self, max_keys=100_000, sweep_interval=60):
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def hit(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            count, expires = self._counts.get(key, (0, now + timeout))
+            self._counts[key] = count + 1, expires
+            if now >= self._next_sweep or len(self._counts) > self.max_keys:
+                self._sweep(now)
+            return count + 1
+
+    def get(self, key):
+        entry = self._counts.get(key)
+        return entry[0] if entry and entry[1] > time.monotonic() else 0
+
+    def _sweep(self, now):
+        self._counts = {key: entry for key, entry in self._counts.items() if entry[1] > now}
+        # Keys are inserted in window order, so the first are the oldest. Drop
+        # a tenth more than needed, so that this does not run on every hit.
+        for key in list(self._counts)[:max(0, len(self._counts) - self.max_keys * 9 // 10)]:
+            del self._counts[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class CacheCounters:
+    """Counters in a Django cache, shared by every process that uses it."""
+
+    blocking = True
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def hit(self, key, timeout):
+        try:
+            return self.cache.incr(key)
+        except ValueError:  # not there yet
+            if self.cache.add(key, 1, timeout):
+                return 1
+            return self.cache.incr(key)
+
+    def get(self, key):
+        return self.cache.get(key, 0)
+
+
+_counters = (None, None)
+_counters_lock = threading.Lock()
+
+
+def get_counters():
+    """The THROTTLE_BACKEND instance, made again when the settings change."""
+    global _counters
+    config = (getattr(settings, 'THROTTLE_BACKEND', 'events.throttling.LocalCounters'),
+              getattr(settings, 'THROTTLE_CACHE', 'default'))
+    if _counters[0] != config:
+        with _counters_lock:
+            if _counters[0] != config:
+                _counters = config, import_string(config[0])()
+    return _counters[1]
+
+
+def client_address(request):
+    """The client's address, from X-Forwarded-For behind THROTTLE_PROXY_COUNT
+    proxies. IPv6 clients get a /64 each, so they cannot rotate addresses."""
+    address = request.META.get('REMOTE_ADDR', '')
+    proxies = getattr(settings, 'THROTTLE_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= proxies:
+            try:
+                address = str(ip_address(forwarded[-proxies]))
+            except ValueError:
+                pass  # not set by our proxies
+    if ':' in address:
+        address = str(ip_network(f'{address}/64', strict=False).network_address)
+    return address
+
+
+def _retry_after(previous, current, limit, window, elapsed):
+    """Seconds until the next attempt fits in the window again."""
+    target = limit - 1
+    if current > target:
+        # Only once the current window has become the previous one.
+        wait = window - elapsed + window * (1 - target / current)
+    else:
+        wait = window * (1 - (target - current) / previous) - elapsed
+    return max(1, math.ceil(wait))
+
+
+def check(counters, scope, address, rates, now=None):
+    """Count an attempt; returns None if allowed, or (rule, retry_after)."""
+    now = time.time() if now is None else now
+    for rule in RULES:
+        rate = rates.get(rule)
+        if not rate:
+            continue
+        limit, window = parse_rate(rate)
+        number, elapsed = divmod(now, window)
+        key = f'throttle:{scope}:{rule}:{address}:' if rule == 'ip' else f'throttle:{scope}:{rule}:'
+        current = counters.hit(f'{key}{int(number)}', 2 * window)
+        previous = counters.get(f'{key}{int(number) - 1}')
+        if previous * (1 - elapsed / window) + current > limit:
+            return rule, _retry_after(previous, current, limit, window, elapsed)
+    return None
+
+
+class ScopeStats:
+    def __init__(self):
+        self.allowed = 0
+        self.limited = dict.fromkeys(RULES, 0)
+        self.errors = 0
+        self.check_us = Histogram(US_BUCKETS)
+
+    def as_dict(self):
+        return {'allowed': self.allowed, 'limited': dict(self.limited), 'errors': self.errors,
+                'check_us': self.check_us.as_dict()}
+
+
+class ThrottleStats:
+    """Allowed and rejected attempts and check times per scope, in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes = {}
+
+    def record(self, scope, result, seconds, error=False):
+        with self._lock:
+            stats = self._scopes.get(scope)
+            if stats is None:
+                stats = self._scopes[scope] = ScopeStats()
+            if error:
+                stats.errors += 1
+            if result is None:
+                stats.allowed += 1
+            else:
+                stats.limited[result[0]] += 1
+            stats.check_us.observe(seconds * 1e6)
+
+    def snapshot(self):
+        with self._lock:
+            scopes = {scope: stats.as_dict() for scope, stats in sorted(self._scopes.items())}
+        return {'backend': getattr(settings, 'THROTTLE_BACKEND', 'events.throttling.LocalCounters'),
+                'rates': getattr(settings, 'THROTTLE_RATES', {}), 'scopes': scopes}
+
+    def reset(self):
+        with self._lock:
+            self._scopes.clear()
+
+
+throttle_stats = ThrottleStats()
+
+
+def _check_request(request, scope):
+    rates = getattr(settings, 'THROTTLE_RATES', {}).get(scope)
+    if request.method in SAFE_METHODS or not rates:
+        return None
+    started = time.perf_counter()
+    try:
+        result = check(get_counters(), scope, client_address(request), rates)
+    except Exception:
+        # A throttle that is down must not take the forms down with it.
+        logger.warning('Throttle check for %r failed; letting the request through.', scope, exc_info=True)
+        throttle_stats.record(scope, None, time.perf_counter() - started, error=True)
+        return None
+    throttle_stats.record(scope, result, time.perf_counter() - started)
+    return result
+
+
+def _too_many(result):
+    response = HttpResponse('Too many submissions. Please try again later.',
+                            status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(result[1])
+    return response
+
+
+def throttle(scope):
+    """Answer 429 Too Many Requests, before the view runs, to unsafe requests
+    past the limits of THROTTLE_RATES[scope]. Works for sync and async views."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                if get_counters().blocking:
+                    result = await sync_to_async(_check_request)(request, scope)
+                else:
+                    result = _check_request(request, scope)
+                if result is not None:
+                    return _too_many(result)
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                result = _check_request(request, scope)
+                if result is not None:
+                    return _too_many(result)
+                return view(request, *args, **kwargs)
+        return inner
+    return decorator
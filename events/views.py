@@ -21,68 +21,257 @@ from django.utils.timezone import make_aware
 from django.shortcuts import render
 from django.utils.timezone import make_aware
 from datetime import datetime
-from itertools import zip_longest
-from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
 from .models import Event
 from .forms import ContactForm
-
-
-def batch_events(iterable, n=3):
-    """Group events into batches of size n"""
-    args = [iter(iterable)] * n
-    return list(zip_longest(*args, fillvalue=None))
-def batch_items(iterable, n=6):
-    from itertools import zip_longest
-    args = [iter(iterable)] * n
-    return list(zip_longest(*args, fillvalue=None))
+from .cache import HOMEPAGE_FRAGMENTS, fragment_versions
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.urls import reverse
+from .homepage import (
+    ARCHIVE_PAGE_SIZE, PREVIOUS_ORDERING, HomepageSnapshot, batch_events, batch_items, next_start,
+    past_events,
+)
+from .pagination import InvalidCursor, keyset_page
+from .writebehind import submit
+from .conditional import club_version, conditional_page, event_version, homepage_version
+from .throttling import throttle
+
+
+@throttle('contact')
+@conditional_page(homepage_version)
 def index(request):
-    now = make_aware(datetime.now())
-
-    # Only fetch approved events that are upcoming (either future date or today with future start_time)
-    events = Event.objects.filter(
-        approved=True).filter(Q(date__gt=now.date()) | Q(date=now.date(), start_time__gte=now.time())).order_by('date', 'start_time')
-
-    event_batches = batch_events(events, 3)
-    next_event = events.first() if events else None
-    previous_qs = Event.objects.filter(
-        approved=True,
-        date__lt=now.date()
-    ).order_by('-date', '-start_time')
-    previous_batches = batch_events(previous_qs, 3)
-    print(previous_batches)
-    clubs = Club.objects.all()
-    club_batches = batch_items(clubs, 6)
-
-    contact_form = ContactForm()
-
+    # The contact form posts here; a submission is queued before the page
+    # data is looked at, so a valid one costs no homepage queries.
     if request.method == 'POST':
         contact_form = ContactForm(request.POST)
         if contact_form.is_valid():
-            contact_form.save()
+            submit(contact_form.save(commit=False))
             # Optionally, add a success message or redirect
-            return redirect('index')  
+            return redirect('index')
+
+    now = make_aware(datetime.now())
+    today = now.date()
+
+    # Only approved events; upcoming means a future date or today with a future
+    # start_time. Everything is evaluated lazily from inside the {% cache %}
+    # blocks of index.html, so a warm fragment cache costs no queries at all.
+    versions = fragment_versions(*HOMEPAGE_FRAGMENTS['Event'], *HOMEPAGE_FRAGMENTS['Club'])
+    homepage = HomepageSnapshot(now)
+    clubs = Club.objects.all()
+    club_batches = SimpleLazyObject(lambda: batch_items(clubs, 6))
 
     return render(request, 'index.html', {
-        'event_batches': event_batches,
-        'next_event': next_event,
-        'events': events,
-        'previous_events': previous_batches,
-        'club_batches': club_batches
+        'homepage': homepage,
+        'club_batches': club_batches,
+        'today': today,
+        # The fragments also vary on when the next event starts, as it then
+        # drops out of the upcoming lists.
+        'next_start': next_start(now, versions['home_upcoming'])[0],
+        'fragment_versions': versions,
+    })
+
+
+@conditional_page(homepage_version)
+def event_archive(request):
+    """Older past events for the homepage carousel, one keyset page at a time.
+
+    Returns carousel items (HTML) with the next cursor in the X-Next-Cursor
+    header, or JSON with ?format=json.
+    """
+    now = make_aware(datetime.now())
+    try:
+        page = keyset_page(past_events(now.date()), PREVIOUS_ORDERING,
+                           cursor=request.GET.get('after'), page_size=ARCHIVE_PAGE_SIZE)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'events': [
+                {
+                    'id': event.id,
+                    'title': event.title,
+                    'description': event.description,
+                    'date': event.date,
+                    'start_time': event.start_time,
+                    'image': event.image.url if event.image else None,
+                    'feedback_url': reverse('feedbacks', kwargs={'id': event.id}),
+                }
+                for event in page
+            ],
+            'next': page.next_cursor,
+        })
+
+    response = render(request, 'events/previous_event_items.html', {
+        'batches': batch_events(page, 3),
+        'appended': True,
     })
+    if page.next_cursor:
+        response['X-Next-Cursor'] = page.next_cursor
+    return response
+
+
+from .search import search_events
+
+SEARCH_RESULTS = 10
+
+
+def event_search(request):
+    """Type-ahead search over approved events: ?q=<text>, best matches first.
+
+    The last word is matched as a prefix, so results follow the typing.
+    """
+    results = search_events(request.GET.get('q', ''), limit=SEARCH_RESULTS)
+    for result in results:
+        result['url'] = reverse('feedbacks', kwargs={'id': result['id']})
+    return JsonResponse({'results': results})
+
+
+
+from datetime import timezone as dt_timezone
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_http_date_safe
+from .conditional import feed_version
+from .feeds import (
+    SYNC_OVERLAP, InvalidSyncToken, feed_changes, feed_events, feed_filters, make_sync_token,
+    read_sync_token, stream_ics, stream_json,
+)
+
+
+@conditional_page(feed_version)
+def events_ics(request):
+    """Approved events as a streamed iCalendar feed; ?club=<id> or ?venue=<name> narrow it."""
+    try:
+        club, venue = feed_filters(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid club.")
+    response = StreamingHttpResponse(stream_ics(request, feed_events(club, venue), 'Club events'),
+                                     content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="events.ics"'
+    return response
+
+
+@conditional_page(feed_version)
+def events_json(request):
+    """Approved events as a streamed JSON feed, filtered like events_ics.
+
+    With ?sync_token=<token from the last response>, or If-Modified-Since,
+    only the events changed since and the ids of the removed ones are sent.
+    """
+    try:
+        club, venue = feed_filters(request)
+        since = read_sync_token(request.GET['sync_token']) if request.GET.get('sync_token') else None
+    except (ValueError, InvalidSyncToken) as exc:
+        return HttpResponseBadRequest(str(exc))
+    modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if since is None and modified_since is not None:
+        since = datetime.fromtimestamp(modified_since, tz=dt_timezone.utc) - SYNC_OVERLAP
+
+    # Taken before reading, so nothing written meanwhile is skipped next time.
+    sync_token = make_sync_token(timezone.now() - SYNC_OVERLAP)
+    changes = feed_changes(since, club, venue) if since else None
+    if changes is None:
+        events, removed, full = feed_events(club, venue), [], True
+    else:
+        (events, removed), full = changes, False
+    return StreamingHttpResponse(stream_json(request, events, removed, sync_token, full),
+                                 content_type='application/json')
 
 
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 from .models import ContactMessage
 
-@staff_member_required  # only admin/staff can view messages
+from django.contrib import messages
+from django.contrib.auth.decorators import user_passes_test
+from django.views.decorators.http import require_POST
+from .inbox import (
+    FOLDERS, INBOX, INBOX_ORDERING, INBOX_PAGE_SIZE, folder_messages, unread_count, update_messages,
+)
+
+
+# Messages are for the site admins; club accounts are staff too.
+@user_passes_test(lambda user: user.is_superuser)
 def view_contact_messages(request):
-    messages = ContactMessage.objects.order_by('-submitted_at')
-    return render(request, 'events/usermessages.html', {'messages': messages})
+    """One keyset page of a folder (?folder=inbox|unread|archived), optionally searched with ?q=."""
+    folder = request.GET.get('folder', INBOX)
+    query = request.GET.get('q', '').strip()
+    try:
+        page = keyset_page(folder_messages(folder, query), INBOX_ORDERING,
+                           cursor=request.GET.get('after'), page_size=INBOX_PAGE_SIZE)
+    except (InvalidCursor, ValueError):
+        return HttpResponseBadRequest("Invalid folder or cursor.")
+    return render(request, 'events/usermessages.html', {
+        'contact_messages': page,
+        'folder': folder,
+        'folders': list(FOLDERS),
+        'query': query,
+        'unread_count': unread_count(),
+    })
+
+
+@require_POST
+@user_passes_test(lambda user: user.is_superuser)
+def update_contact_messages(request):
+    """Mark the selected ``ids`` read or unread, archive, unarchive or delete them."""
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ids')]
+        changed = update_messages(request.POST.get('action'), ids)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    messages.success(request, f'{changed} message{"" if changed == 1 else "s"} updated.')
+    folder = request.POST.get('folder')
+    return redirect(reverse('view_contact_messages') + (f'?folder={folder}' if folder in FOLDERS else ''))
+
+
+from django.contrib.auth.decorators import user_passes_test
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .exports import contact_message_rows, feedback_rows, stream_csv, stream_xlsx
+from .forms import ExportFilterForm
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def export_response(name, header, rows, format):
+    """Stream ``rows`` as a CSV or XLSX download."""
+    filename = f'{name}-{timezone.localdate():%Y-%m-%d}.{format}'
+    if format == 'xlsx':
+        response = StreamingHttpResponse(stream_xlsx(header, rows, name.capitalize()),
+                                         content_type=XLSX_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Clubs are staff too, so exports of everyone's data are for superusers only.
+@user_passes_test(lambda user: user.is_superuser)
+def export_feedback(request, format):
+    """Feedback with its event and club; ?date_from=, ?date_to= (submission dates) and ?club= filter it."""
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    header, rows = feedback_rows(**form.cleaned_data)
+    return export_response('feedback', header, rows, format)
+
+
+@user_passes_test(lambda user: user.is_superuser)
+def export_contact_messages(request, format):
+    """Contact messages, filtered by submission date like export_feedback."""
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    if form.cleaned_data.pop('club') is not None:
+        return HttpResponseBadRequest("Contact messages are not sent to a club.")
+    header, rows = contact_message_rows(**form.cleaned_data)
+    return export_response('contact-messages', header, rows, format)
 
 
 # ========== Authentication Views ==========
 
+@throttle('club_register')
 def club_register(request):
     if request.method == 'POST':
         form = ClubRegistrationForm(request.POST)
@@ -145,11 +334,52 @@ def custom_logout(request):
 
 # ========== Admin Views ==========
 
+from datetime import timedelta
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# Columns the dashboard cards show; descriptions and clubs are never loaded.
+DASHBOARD_EVENT_FIELDS = (
+    'id', 'title', 'date', 'start_time', 'end_time', 'venue', 'guest', 'image', 'image_renditions', 'approved',
+)
+DASHBOARD_ORDERING = ('-date', '-start_time', '-id')
+DASHBOARD_PAGE_SIZE = 24
+
+
 def admin_dashboard(request):
-    events_with_club = Event.objects.select_related('club').all()
-    print(events_with_club)
+    """Summary counts computed in SQL plus one keyset page of events."""
+    today = timezone.localdate()
+    summary = Event.objects.aggregate(
+        total=Count('id'),
+        approved_total=Count('id', filter=Q(approved=True)),
+        pending_total=Count('id', filter=Q(approved=False)),
+        upcoming_week=Count('id', filter=Q(approved=True, date__gte=today, date__lt=today + timedelta(days=7))),
+    )
+    club_totals = Club.objects.annotate(
+        total=Count('event'),
+        pending=Count('event', filter=Q(event__approved=False)),
+        upcoming=Count('event', filter=Q(event__approved=True, event__date__gte=today)),
+    ).order_by('-total', 'name').values('id', 'name', 'total', 'pending', 'upcoming')
+
+    status = request.GET.get('status')
+    club_id = request.GET.get('club')
+    events = Event.objects.only(*DASHBOARD_EVENT_FIELDS)
+    if status in ('approved', 'pending'):
+        events = events.filter(approved=(status == 'approved'))
+    try:
+        if club_id:
+            events = events.filter(club_id=club_id)
+        page = keyset_page(events, DASHBOARD_ORDERING, cursor=request.GET.get('after'),
+                           page_size=DASHBOARD_PAGE_SIZE)
+    except (InvalidCursor, ValueError):
+        return HttpResponseBadRequest("Invalid filter or cursor.")
+
     return render(request, 'events/admin_dashboard.html', {
-        'events': events_with_club
+        'summary': summary,
+        'club_totals': club_totals,
+        'events': page,
+        'status': status,
+        'club_id': club_id,
     })
 
 
@@ -166,7 +396,10 @@ def admin_club_manage(request):
 
 
 
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.contrib import messages
+from .scheduling import conflict_message, conflicting_events, suggest_slots
 
 def admin_event_manage(request):
     all_pending = Event.objects.filter(approved=False).order_by('-date')
@@ -181,6 +414,14 @@ def admin_event_manage(request):
 
 def approve_event(request, event_id):
     event = get_object_or_404(Event, id=event_id)
+    conflicts = conflicting_events(event.venue, event.date, event.start_time, event.end_time,
+                                   exclude=event.pk, approved_only=True)
+    if conflicts:
+        slots = suggest_slots(event.venue, event.date, event.start_time, event.end_time,
+                              exclude=event.pk, approved_only=True)
+        messages.error(request, f'"{event.title}" was not approved: '
+                                + conflict_message(event.venue, event.date, conflicts, slots))
+        return redirect('admin_event_manage')
     event.approved = True
     event.save()
     return redirect('admin_event_manage')  # Instead of 'admin_dashboard'
@@ -190,7 +431,46 @@ def approve_event(request, event_id):
 def reject_event(request, event_id):
     event = get_object_or_404(Event, id=event_id)
     event.delete()
-    return redirect('admin_events')  # Instead of 'admin_dashboard'
+    return redirect('admin_event_manage')  # Instead of 'admin_dashboard'
+
+
+from collections import Counter
+from django.contrib import messages
+from django.contrib.auth.decorators import user_passes_test
+from django.views.decorators.http import require_POST
+from .moderation import moderate_events
+
+@require_POST
+@user_passes_test(lambda user: user.is_superuser)
+def bulk_moderate_events(request):
+    """Approve or reject many pending events at once.
+
+    Takes the selected ``event_ids``, or ``scope=all_pending`` optionally
+    narrowed by ``club``, ``date_from`` and ``date_to``. Answers JSON with the
+    outcome per ID when asked for (?format=json), otherwise redirects back to
+    the queue.
+    """
+    action = request.POST.get('action')
+    try:
+        if request.POST.get('scope') == 'all_pending':
+            filters = {'club': 'club_id', 'date_from': 'date__gte', 'date_to': 'date__lte'}
+            queryset = Event.objects.filter(approved=False, **{
+                lookup: request.POST[param] for param, lookup in filters.items() if request.POST.get(param)
+            })
+            results = moderate_events(action, queryset=queryset)
+        else:
+            ids = [int(pk) for pk in request.POST.getlist('event_ids')]
+            results = moderate_events(action, ids=ids)
+    except (ValueError, ValidationError) as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'results': {str(pk): outcome for pk, outcome in results.items()}})
+
+    summary = Counter(results.values())
+    messages.success(request, ', '.join(f'{count} {outcome.replace("_", " ")}' for outcome, count in summary.items())
+                     or 'No events matched.')
+    return redirect('admin_event_manage')
 
 
 
@@ -214,6 +494,7 @@ def suspend_club(request, club_id):
 from django.http import HttpResponseForbidden
 from django.contrib.auth.decorators import login_required
 @login_required
+@conditional_page(club_version)
 def club_dashboard(request):
     user = request.user
     try:
@@ -235,6 +516,7 @@ def club_dashboard(request):
 
 
 
+@conditional_page(club_version)
 def manage_event(request):
     user = request.user
     try:
@@ -269,7 +551,6 @@ def add_event(request):
     except Club.DoesNotExist:
         return HttpResponse("No club associated with your account.")
     if request.method == 'POST':
-        print('/////')
         # form = EventForm(request.POST)
         form = EventForm(request.POST, request.FILES)
 
@@ -278,7 +559,6 @@ def add_event(request):
             event.club = club  # ✅ Assign the Club instance
             event.approved = False  # Must be approved by admin
             event.save()
-            print('?????/')
             return HttpResponse("""
                 <script>
                     alert('Created Successfully...Wait for Approval!');
@@ -297,19 +577,22 @@ def add_event(request):
 
 from django.shortcuts import get_object_or_404, redirect, render
 from django.http import HttpResponseForbidden
+from django.db import transaction
 from .models import Event, Club
 from .forms import EventForm
+from .storage import release
 from django.contrib.auth.decorators import login_required
 
 @login_required
 def edit_event(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
+    event = get_object_or_404(Event.objects.select_related('club'), id=event_id)
 
     # Ensure the logged-in user is the owner of the event
-    if event.club.user != request.user:
+    if event.club.user_id != request.user.id:
         return HttpResponseForbidden("You are not allowed to edit this event.")
 
     if request.method == 'POST':
+        old_image = event.image.name
         # form = EventForm(request.POST, instance=event)
         form = EventForm(request.POST, request.FILES, instance=event)
 
@@ -317,6 +600,9 @@ def edit_event(request, event_id):
             edited_event = form.save(commit=False)
             edited_event.approved = False  # Re-approval required after editing
             edited_event.save()
+            if edited_event.image.name != old_image:
+                # Stored once per content, so other events may still use it.
+                transaction.on_commit(lambda: release(old_image))
             return redirect('club_dashboard')
     else:
         form = EventForm(instance=event)
@@ -327,10 +613,10 @@ def edit_event(request, event_id):
 
 @login_required
 def delete_event(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
+    event = get_object_or_404(Event.objects.select_related('club'), id=event_id)
 
     # Ensure the logged-in user is the owner of the event
-    if event.club.user != request.user:
+    if event.club.user_id != request.user.id:
         return HttpResponseForbidden("You are not allowed to delete this event.")
 
     event.delete()
@@ -345,22 +631,57 @@ from django.shortcuts import render, get_object_or_404, redirect
 from .models import Event, Feedback
 from .forms import FeedbackForm
 
+# Feedback is listed newest first, one keyset page at a time.
+FEEDBACK_ORDERING = ('-submitted_at', '-id')
+FEEDBACK_PAGE_SIZE = 20
+
+
+@throttle('feedback')
+@conditional_page(event_version)
 def feedbacks_view(request, id):
     event = get_object_or_404(Event, id=id)
-    feedbacks = Feedback.objects.filter(event=event)
-    
+
     if request.method == 'POST':
         form = FeedbackForm(request.POST)
         if form.is_valid():
             # Save the new feedback for the event
             feedback = form.save(commit=False)
             feedback.event = event
-            feedback.save()
+            submit(feedback)
             return redirect('feedbacks', id=event.id)  # Redirect to the same page to show updated feedbacks
     else:
         form = FeedbackForm()
 
-    return render(request, 'events/feedbacks.html', {'event': event, 'form': form, 'feedbacks': feedbacks})
+    try:
+        feedbacks = keyset_page(Feedback.objects.filter(event=event), FEEDBACK_ORDERING,
+                                cursor=request.GET.get('after'), page_size=FEEDBACK_PAGE_SIZE)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    return render(request, 'events/feedbacks.html', {
+        'event': event,
+        'form': form,
+        'feedbacks': feedbacks,
+        'is_first_page': not request.GET.get('after'),
+    })
+
+
+def feedback_page(request, id):
+    """One page of an event's feedback as list items, for the club feedback modal.
+
+    The cursor for the following page is sent in the X-Next-Cursor header.
+    """
+    event = get_object_or_404(Event.objects.only('id'), id=id)
+    try:
+        feedbacks = keyset_page(Feedback.objects.filter(event=event), FEEDBACK_ORDERING,
+                                cursor=request.GET.get('after'), page_size=FEEDBACK_PAGE_SIZE)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    response = render(request, 'events/feedback_items.html', {'feedbacks': feedbacks})
+    if feedbacks.next_cursor:
+        response['X-Next-Cursor'] = feedbacks.next_cursor
+    return response
 
 
 
@@ -372,25 +693,66 @@ from .models import Feedback
 from django.shortcuts import render, get_object_or_404
 from .models import Feedback, Club
 from django.utils import timezone
-from collections import defaultdict
 
+@conditional_page(club_version)
 def club_view_feedbacks(request):
     club = get_object_or_404(Club, user=request.user)
-    past_events = Event.objects.filter(club=club, date__lt=timezone.now()).order_by('-date')
-    feedbacks = Feedback.objects.select_related('event').filter(event__in=past_events)
-
-    events_with_feedback = defaultdict(list)
-    for feedback in feedbacks:
-        events_with_feedback[feedback.event].append(feedback)
-
-    # Convert to template-friendly list
-    events_feedback_list = [
-        {'event': event, 'feedback_list': feedback_list}
-        for event, feedback_list in events_with_feedback.items()
-    ]
-    print(events_feedback_list)
+    # Only the summaries; each modal loads its feedback from feedback_page.
+    past_events = Event.objects.filter(
+        club=club, date__lt=timezone.localdate(), feedback_count__gt=0
+    ).order_by('-date').only('id', 'title', 'description', 'date', 'feedback_count', 'rating_sum')
     return render(request, 'events/clubfeedbacks.html', {
-        'events_feedback_list': events_feedback_list
+        'events': past_events
     })
 
 
+
+
+from django.utils import timezone
+from .bookings import cancel_booking, reserve_seat
+from .forms import BookingForm
+from .models import Booking
+
+@throttle('booking')
+def book_event(request, id):
+    """Reserve a seat at an upcoming approved event, or join its waitlist."""
+    event = get_object_or_404(Event, id=id, approved=True, date__gte=timezone.localdate())
+    booking = None
+
+    if request.method == 'POST':
+        form = BookingForm(request.POST)
+        if form.is_valid():
+            booking = reserve_seat(event, form.cleaned_data['name'], form.cleaned_data['email'])
+            event.refresh_from_db(fields=['seats_booked'])
+    else:
+        form = BookingForm()
+
+    return render(request, 'events/book_event.html', {'event': event, 'form': form, 'booking': booking})
+
+
+def cancel_booking_view(request, token):
+    booking = get_object_or_404(Booking.objects.select_related('event'), cancel_token=token)
+    if request.method == 'POST' and booking.status != Booking.CANCELLED:
+        cancel_booking(booking)
+        booking.refresh_from_db(fields=['status'])
+    return render(request, 'events/cancel_booking.html', {'booking': booking})
+
+
+from django.conf import settings
+from django.contrib.auth.decorators import user_passes_test
+from .instrumentation import registry
+from .throttling import throttle_stats
+from .writebehind import get_queue
+
+# Clubs are staff too, so the stats and their reset are for superusers only.
+@user_passes_test(lambda user: user.is_superuser)
+def performance_stats(request):
+    """Per-view request histograms of this process (see events/middleware.py),
+    the throttled form posts, plus the write-behind queue when it is on."""
+    if request.method == 'POST' and request.POST.get('reset'):
+        registry.reset()
+        throttle_stats.reset()
+    stats = {'views': registry.snapshot(), 'throttle': throttle_stats.snapshot()}
+    if settings.WRITE_BEHIND:
+        stats['write_behind'] = get_queue().stats()
+    return JsonResponse(stats)
@@ -0,0 +1,287 @@
+"""Write-behind buffering for public form submissions.
+
+With WRITE_BEHIND on, submit() appends an already validated, unsaved
+instance to a spool file and an in-memory queue, and a background thread
+inserts what is queued with bulk_create() every WRITE_BEHIND_INTERVAL
+seconds, or as soon as WRITE_BEHIND_BATCH_SIZE rows wait. One write
+transaction per batch instead of one per submission keeps the SQLite write
+lock free for everybody else during a burst.
+
+Each process spools to its own files in WRITE_BEHIND_SPOOL_DIR and deletes a
+file only once its rows are committed. Files left behind by a dead process
+are replayed by the next queue to start, or by ``manage.py
+flush_write_behind``. Delivery is at least once: a crash between a commit
+and the unlink replays that batch.
+
+A batch that fails is written again one row at a time, so one bad row (say,
+feedback on an event deleted meanwhile) does not hold up the others. A row
+that breaks a constraint on its own is dead-lettered: logged with its data
+and dropped from the spool. Rows that fail for any other reason are retried
+on the next flushes, up to WRITE_BEHIND_MAX_ATTEMPTS times in all, and then
+dead-lettered too. A flush stopped by any other error leaves the rows it did
+not get to for the next one.
+"""
+import atexit
+import itertools
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core import serializers
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from .instrumentation import MS_BUCKETS, Histogram
+from .ratings import record_feedback_batch
+
+logger = logging.getLogger(__name__)
+
+ROW_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+
+# What the post_save signals would have done, for the rows of one batch.
+AFTER_BULK_CREATE = {
+    'events.feedback': record_feedback_batch,
+}
+
+
+def process_alive(pid):
+    if os.name == 'nt':
+        return True  # os.kill(pid, 0) would signal it; recover these manually
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_batch(instances, batch_size):
+    """Insert unsaved instances of any models in one transaction."""
+    by_model = {}
+    for instance in instances:
+        by_model.setdefault(instance._meta.label_lower, []).append(instance)
+    try:
+        with transaction.atomic():
+            for label, objs in by_model.items():
+                type(objs[0]).objects.bulk_create(objs, batch_size=batch_size)
+                if label in AFTER_BULK_CREATE:
+                    AFTER_BULK_CREATE[label](objs)
+    except Exception:
+        # Rolled back: the ids bulk_create() gave them are not theirs.
+        for instance in instances:
+            instance.pk = None
+            instance._state.adding = True
+        raise
+
+
+class WriteBehindQueue:
+    def __init__(self, spool_dir, batch_size=200, interval=1.0, fsync=False, max_attempts=5):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()        # guards the pending rows and the spool file
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._wakeup = threading.Event()
+        self._pending = []
+        self._oldest = None
+        self._spool = None
+        self._spool_names = itertools.count()
+        self._retry = []  # (instances, spool path, attempts so far) whose flush failed
+        self._thread = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+        self.flush_ms = Histogram(MS_BUCKETS)
+        self.batch_rows = Histogram(ROW_BUCKETS)
+
+    def submit(self, instance):
+        for field in instance._meta.concrete_fields:
+            if getattr(field, 'auto_now_add', False) or getattr(field, 'auto_now', False):
+                setattr(instance, field.attname, timezone.now())
+        line = serializers.serialize('json', [instance]) + '\n'
+        with self._lock:
+            if self._spool is None:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                path = self.spool_dir / f'{os.getpid()}-{next(self._spool_names):06d}.jsonl'
+                self._spool = (path, open(path, 'a', encoding='utf-8'))
+            spool = self._spool[1]
+            spool.write(line)
+            spool.flush()
+            if self.fsync:
+                os.fsync(spool.fileno())
+            self._pending.append(instance)
+            self._oldest = self._oldest or time.monotonic()
+            depth = len(self._pending)
+        self.start()
+        if depth >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        self.recover()
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Write-behind flush failed')
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, spool = self._pending, self._spool
+                self._pending, self._spool, self._oldest = [], None, None
+            if spool:
+                spool[1].close()
+            jobs, self._retry = self._retry, []
+            if batch:
+                jobs.append((batch, spool[0] if spool else None, 0))
+
+            written = 0
+            try:
+                while jobs:
+                    written += self._write_job(*jobs[0])
+                    jobs.pop(0)
+            finally:
+                # Whatever an unexpected error interrupted waits for the next flush.
+                self._retry[:0] = jobs
+            return written
+
+    def _write_job(self, instances, path, attempts):
+        started = time.perf_counter()
+        try:
+            write_batch(instances, self.batch_size)
+        except DatabaseError:
+            logger.exception('Could not write %d queued rows; writing them one by one', len(instances))
+            self.failed_flushes += 1
+            return self._write_rows(instances, path, attempts + 1)
+        self.flush_ms.observe((time.perf_counter() - started) * 1000)
+        self.batch_rows.observe(len(instances))
+        self.flushed += len(instances)
+        if path:
+            path.unlink(missing_ok=True)
+        return len(instances)
+
+    def _write_rows(self, instances, path, attempts):
+        """Write the rows of a failed batch separately; keep the ones that may
+        still succeed for the next flush and dead-letter the rest."""
+        written, retry = 0, []
+        for instance in instances:
+            try:
+                write_batch([instance], 1)
+            except IntegrityError:
+                self._dead_letter(instance)
+            except DatabaseError:
+                if attempts < self.max_attempts:
+                    retry.append(instance)
+                else:
+                    self._dead_letter(instance)
+            else:
+                written += 1
+        self.flushed += written
+        if retry:
+            logger.warning('Could not write %d queued rows (attempt %d of %d); will retry',
+                           len(retry), attempts, self.max_attempts)
+            self._retry.append((retry, path and self._rewrite_spool(path, retry), attempts))
+        elif path:
+            path.unlink(missing_ok=True)
+        return written
+
+    def _dead_letter(self, instance):
+        self.dead_lettered += 1
+        logger.error('Dropping a queued row that cannot be written: %s',
+                     serializers.serialize('json', [instance]), exc_info=True)
+
+    def _rewrite_spool(self, path, instances):
+        """Replace the spool file with just ``instances``, so that a restart
+        replays neither the rows written nor the dropped ones."""
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as spool:
+            spool.writelines(serializers.serialize('json', [instance]) + '\n' for instance in instances)
+            if self.fsync:
+                spool.flush()
+                os.fsync(spool.fileno())
+        os.replace(tmp, path)
+        return path
+
+    def recover(self, everything=False):
+        """Queue the rows spooled by dead processes for the next flush.
+
+        With ``everything``, take over the files of all other processes,
+        alive or not. Returns the number of rows recovered.
+        """
+        if not self.spool_dir.is_dir():
+            return 0
+        recovered = 0
+        for path in sorted(self.spool_dir.glob('*.jsonl')):
+            pid = int(path.name.split('-', 1)[0])
+            if pid == os.getpid() or (not everything and process_alive(pid)):
+                continue
+            claimed = self.spool_dir / f'{os.getpid()}-recovered-{path.name}'
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                continue  # another process claimed it first
+            with open(claimed, encoding='utf-8') as spool:
+                instances = [obj.object for line in spool if line.strip()
+                             for obj in serializers.deserialize('json', line)]
+            with self._flush_lock:
+                self._retry.append((instances, claimed, 0))
+            recovered += len(instances)
+        return recovered
+
+    def stats(self):
+        with self._lock:
+            depth = len(self._pending)
+            oldest = self._oldest
+        return {
+            'queue_depth': depth + sum(len(instances) for instances, _, _ in self._retry),
+            'oldest_pending_seconds': time.monotonic() - oldest if oldest else None,
+            'flushed': self.flushed,
+            'failed_flushes': self.failed_flushes,
+            'dead_lettered': self.dead_lettered,
+            'flush_ms': self.flush_ms.as_dict(),
+            'batch_rows': self.batch_rows.as_dict(),
+        }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = WriteBehindQueue(
+                    settings.WRITE_BEHIND_SPOOL_DIR,
+                    batch_size=getattr(settings, 'WRITE_BEHIND_BATCH_SIZE', 200),
+                    interval=getattr(settings, 'WRITE_BEHIND_INTERVAL', 1.0),
+                    fsync=getattr(settings, 'WRITE_BEHIND_FSYNC', False),
+                    max_attempts=getattr(settings, 'WRITE_BEHIND_MAX_ATTEMPTS', 5),
+                )
+    return _queue
+
+
+def submit(instance):
+    """Save a validated, unsaved instance now, or queue it with WRITE_BEHIND on."""
+    if getattr(settings, 'WRITE_BEHIND', False):
+        get_queue().submit(instance)
+    else:
+        instance.save()